@@ -0,0 +1,181 @@
+"""Benchmark the visuals pipeline stage by stage.
+
+Times ingest (``read_excel`` and the cached load), metric extraction, value
+coercion, the top-5 selections and each chart's ``savefig``, records the peak
+traced memory of every stage, and repeats the data stages on synthetic sheets
+scaled up to county/tract-sized geography counts. Results are written as JSON
+so runs from different commits can be compared::
+
+    python benchmarks/bench_pipeline.py --out bench_results.json
+    python benchmarks/bench_pipeline.py --compare bench_results.json --out new.json
+
+Synthetic sheets tile the bundled state blocks side by side. Excel caps a
+sheet at 16,384 columns (about 4,000 geographies), so ``read_excel`` is only
+timed on synthetic workbooks up to ``--xlsx-max`` geographies.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pcid.cells import parse_cells  # noqa: E402
+from pcid.ingest import DEFAULT_WORKBOOK, load_workbook_frame  # noqa: E402
+from pcid.layout import TableLayout  # noqa: E402
+from pcid.metrics import build_metrics  # noqa: E402
+from pcid.render import render_chart  # noqa: E402
+from pcid.selection import top_device_ownership, top_income_broadband, top_optic_satellite_gap  # noqa: E402
+
+BLOCK_WIDTH = 4
+EXCEL_MAX_COLUMNS = 16384
+
+
+def scale_sheet(df, n_geographies):
+    """Return a copy of the sheet with its state blocks tiled to ``n_geographies``."""
+    layout = TableLayout.from_frame(df)
+    _, positions = layout.geography_positions()
+    block_cols = (positions[:, np.newaxis] + np.arange(BLOCK_WIDTH)).ravel()
+    blocks = df.to_numpy(dtype=object)[:, block_cols]
+    repeats = -(-n_geographies // len(positions))
+    tiled = np.tile(blocks, (1, repeats))[:, :n_geographies * BLOCK_WIDTH]
+
+    columns = [df.columns[0]]
+    for g in range(n_geographies):
+        columns.append(f'Geography {g:06d}')
+        columns.extend(f'Unnamed: {g * BLOCK_WIDTH + k}' for k in range(1, BLOCK_WIDTH))
+    # One object block, the same shape load_workbook_frame() returns
+    values = np.concatenate([df.to_numpy(dtype=object)[:, :1], tiled], axis=1)
+    return pd.DataFrame(values, columns=columns, dtype=object)
+
+
+def measure(func, repeat):
+    """Run ``func`` ``repeat`` times untraced, then once under tracemalloc."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        'seconds_min': min(timings),
+        'seconds_median': statistics.median(timings),
+        'repeat': repeat,
+        'peak_bytes': peak,
+    }
+
+
+def bench_scale(df, n_geographies, repeat, out_dir, xlsx_path=None, render=False):
+    results = []
+
+    def record(stage, func, runs=repeat):
+        value, stats = measure(func, runs)
+        results.append(dict(stage=stage, geographies=n_geographies, **stats))
+        print(f'{stage:<22} {n_geographies:>8,} geos  {stats["seconds_min"] * 1000:10.2f} ms'
+              f'  peak {stats["peak_bytes"] / 2**20:8.1f} MiB', flush=True)
+        return value
+
+    if xlsx_path is not None:
+        record('read_excel', lambda: pd.read_excel(xlsx_path), runs=1)
+        record('cache_load', lambda: load_workbook_frame(xlsx_path, cache_dir=out_dir))
+
+    df_metrics = record('extract', lambda: build_metrics(df))
+    layout = TableLayout.from_frame(df)
+    _, positions = layout.geography_positions()
+    cells = df.to_numpy(dtype=object)[layout.row('Smartphone'), positions + layout.offset('Percent')]
+    record('coerce', lambda: parse_cells(cells))
+
+    top1 = record('top5_visual1', lambda: top_income_broadband(df_metrics, 5))
+    top2 = record('top5_visual2', lambda: top_device_ownership(df_metrics, 5))
+    top3 = record('top5_visual3', lambda: top_optic_satellite_gap(df_metrics, [top1, top2], 5))
+
+    if render:
+        for name, chart, top in (('visual1', 'income_broadband', top1),
+                                 ('visual2', 'device_ownership', top2),
+                                 ('visual3', 'optic_satellite_gap', top3)):
+            path = os.path.join(out_dir, f'{name}.png')
+            record(f'savefig_{name}', lambda: render_chart(chart, top, path))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """Print the time ratio of every stage present in both result sets."""
+    old = {(r['stage'], r['geographies']): r for r in previous['results']}
+    print(f'\n{"stage":<22} {"geos":>8}  {"before ms":>10} {"after ms":>10}  ratio')
+    for r in current['results']:
+        before = old.get((r['stage'], r['geographies']))
+        if before is None:
+            continue
+        ratio = r['seconds_min'] / before['seconds_min'] if before['seconds_min'] else float('inf')
+        flag = '  <-- slower' if ratio > 1.1 else ''
+        print(f'{r["stage"]:<22} {r["geographies"]:>8,}  {before["seconds_min"] * 1000:10.2f}'
+              f' {r["seconds_min"] * 1000:10.2f}  {ratio:5.2f}{flag}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the visuals pipeline stages.')
+    parser.add_argument('--input', default=DEFAULT_WORKBOOK, help='bundled workbook to benchmark')
+    parser.add_argument('--scales', default='3000,80000', help='synthetic geography counts, comma separated')
+    parser.add_argument('--xlsx-max', type=int, default=0,
+                        help='also write and time read_excel on synthetic workbooks up to this many geographies')
+    parser.add_argument('--repeat', type=int, default=5, help='timed repetitions per stage')
+    parser.add_argument('--out', default='bench_results.json', help='JSON results file')
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        df = load_workbook_frame(args.input, cache_dir=tmp)
+        n_states = len(TableLayout.from_frame(df).geography_positions()[0])
+        results = bench_scale(df, n_states, args.repeat, tmp, xlsx_path=args.input, render=True)
+        for n in scales:
+            scaled = scale_sheet(df, n)
+            xlsx_path = None
+            if n <= args.xlsx_max and n * BLOCK_WIDTH < EXCEL_MAX_COLUMNS:
+                xlsx_path = os.path.join(tmp, f'scaled_{n}.xlsx')
+                scaled.to_excel(xlsx_path, index=False)
+            results += bench_scale(scaled, n, args.repeat, tmp, xlsx_path=xlsx_path)
+            del scaled
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': {'numpy': np.__version__, 'pandas': pd.__version__},
+        'results': results,
+    }
+    with open(args.out, 'w') as fh:
+        json.dump(report, fh, indent=2)
+    print(f'\nWrote {len(results)} measurements to {args.out}')
+
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(json.load(fh), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Shared data layer for the PCID-3140 Project 2 visuals.
+
+The common entry points are re-exported here, but each submodule is only
+imported on first attribute access, so ``import pcid`` stays cheap and a
+data-only caller never pays for matplotlib or a process pool.
+"""
+
+import importlib
+
+_EXPORTS = {
+    'load_workbook_frame': 'pcid.ingest',
+    'load_metrics': 'pcid.metrics',
+    'build_metrics': 'pcid.metrics',
+    'METRICS': 'pcid.metrics',
+    'DERIVED': 'pcid.metrics',
+    'extract_metrics': 'pcid.extract',
+    'TableLayout': 'pcid.layout',
+    'top_income_broadband': 'pcid.selection',
+    'top_device_ownership': 'pcid.selection',
+    'top_optic_satellite_gap': 'pcid.selection',
+    'render_chart': 'pcid.render',
+    'render_charts': 'pcid.render',
+    'visuals_graph': 'pcid.pipeline',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
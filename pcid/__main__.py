@@ -0,0 +1,5 @@
+import sys
+
+from pcid.cli import main
+
+sys.exit(main())
@@ -0,0 +1,112 @@
+"""Grouped bar charts for any metrics frame.
+
+A chart is a list of series (metrics columns) over a list of geographies
+(frame rows). Bar offsets inside each group are computed as one array, and
+each series is drawn with a single ``bar`` call over every geography, so a
+chart of N states x M series costs M calls however large N gets.
+``small_multiples`` splits many geographies across a grid of panels that
+share one y axis, e.g. all 51 states x every device/subscription type.
+
+The three visuals in ``pcid.render`` are drawn with ``draw_grouped``.
+"""
+
+import math
+
+import numpy as np
+
+PALETTE = ('#5da5da', '#faa43a', '#60bd68', '#4d4d4d', '#f17cb0', '#b2912f', '#b276b2', '#decf3f', '#f15854')
+
+
+def bar_offsets(n_series, width):
+    """Offsets of each series' bars from the group centre."""
+    return (np.arange(n_series) - (n_series - 1) / 2) * width
+
+
+def grouped_bars(ax, frame, series, labels=None, colors=None, width=None, scale=1, tick_labels=None):
+    """Draw ``series`` (column names) of every row of ``frame`` as grouped bars on ``ax``.
+
+    ``labels`` and ``colors`` give the legend label and colour of each series
+    (default: the column name and ``PALETTE``); ``width`` is the width of one
+    bar (default: the groups fill 80% of their slot); values are divided by
+    ``scale``. The x ticks show ``tick_labels``, or the ``State`` column.
+    """
+    labels = list(labels or series)
+    colors = list(colors or PALETTE[:len(series)])
+    if len(colors) < len(series):
+        raise ValueError(f'{len(series)} series but only {len(colors)} colours')
+    width = width or 0.8 / len(series)
+    x = np.arange(len(frame))
+    for column, label, color, offset in zip(series, labels, colors, bar_offsets(len(series), width)):
+        values = frame[column].to_numpy()
+        ax.bar(x + offset, values / scale if scale != 1 else values, width, label=label, color=color)
+    ax.set_xticks(x)
+    ax.set_xticklabels(frame['State'].astype(str).tolist() if tick_labels is None else tick_labels)
+    return x
+
+
+def _style(ax, ylabel=None, title=None, ylim=None, plain_y=False, legend_loc='best'):
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    if title:
+        ax.set_title(title)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    if plain_y:
+        ax.ticklabel_format(style='plain', axis='y')
+    if legend_loc:
+        ax.legend(loc=legend_loc)
+
+
+def draw_grouped(fig, frame, series, labels=None, colors=None, width=None, scale=1, tick_labels=None,
+                 ylabel=None, title=None, ylim=None, plain_y=False, legend_loc='best'):
+    """One grouped bar chart filling ``fig``; returns its axes."""
+    ax = fig.subplots()
+    grouped_bars(ax, frame, series, labels, colors, width, scale, tick_labels)
+    _style(ax, ylabel, title, ylim, plain_y, legend_loc)
+    return ax
+
+
+def small_multiples(fig, frame, series, per_panel=10, ncols=1, labels=None, colors=None, width=None, scale=1,
+                    ylabel=None, title=None, ylim=None, plain_y=False, legend_loc='upper right'):
+    """Grouped bars for many geographies, ``per_panel`` rows of ``frame`` per panel.
+
+    Panels share the y axis so bar heights compare across the grid, and one
+    legend for the whole figure sits at ``legend_loc``. Returns the 2-D array
+    of axes.
+    """
+    panels = max(1, math.ceil(len(frame) / per_panel))
+    nrows = math.ceil(panels / ncols)
+    axes = fig.subplots(nrows, ncols, sharey=True, squeeze=False)
+    for i, ax in enumerate(axes.flat):
+        if i >= panels:
+            ax.set_visible(False)
+            continue
+        chunk = frame.iloc[i * per_panel:(i + 1) * per_panel]
+        grouped_bars(ax, chunk, series, labels, colors, width, scale)
+        ax.set_xlim(-0.5, per_panel - 0.5)  # Same bar width in a short last panel
+        ax.tick_params(axis='x', labelrotation=45)
+        _style(ax, ylabel if i % ncols == 0 else None, None, ylim, plain_y, legend_loc=None)
+    if legend_loc:
+        fig.legend(*axes.flat[0].get_legend_handles_labels(), loc=legend_loc, ncols=len(series))
+    if title:
+        fig.suptitle(title, x=0.02, horizontalalignment='left')
+    return axes
+
+
+def render_grouped(frame, series, path, per_panel=None, ncols=1, figsize=None, **style):
+    """Draw ``frame`` as one grouped chart (or a grid when ``per_panel`` is set) into ``path``."""
+    from pcid.render import _new_figure
+
+    if per_panel and len(frame) > per_panel:
+        rows = math.ceil(math.ceil(len(frame) / per_panel) / ncols)
+        fig = _new_figure(figsize or (max(6, 0.25 * per_panel * len(series)) * ncols, 3.5 * rows))
+        small_multiples(fig, frame, series, per_panel, ncols, **style)
+    else:
+        fig = _new_figure(figsize or (max(10, 0.25 * len(frame) * len(series)), 6))
+        draw_grouped(fig, frame, series, **style)
+    try:
+        fig.tight_layout()
+        fig.savefig(path)
+    finally:
+        fig.clear()
+    return path
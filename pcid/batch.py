@@ -0,0 +1,117 @@
+"""Batch ingest of many ACS workbooks (one per year or geography level).
+
+Each workbook is parsed and reduced to metrics in its own worker process,
+since openpyxl parsing is CPU-bound and single-threaded, and the results are
+stacked into one long table keyed by (year, geography)::
+
+    python -m pcid.batch data/ --out metrics_long.csv
+    python -m pcid.batch "data/ACS_*_county.xlsx" --workers 8
+"""
+
+import argparse
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from pcid.ingest import cache_dir_for, load_workbook_frame, prune_cache
+from pcid.metrics import build_metrics
+
+LONG_COLUMNS = ['year', 'geo_level', 'geography', 'metric', 'value']
+GEO_LEVELS = ('tract', 'county', 'state')
+
+_YEAR_PATTERN = re.compile(r'(?<!\d)(20\d\d|19\d\d)(?!\d)')
+
+
+def expand_inputs(inputs):
+    """Expand directories and glob patterns into a sorted list of workbooks."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.xlsx')))
+        elif any(ch in item for ch in '*?['):
+            paths.extend(glob.glob(item))
+        else:
+            paths.append(item)
+    # Skip Excel's '~$' lock files left behind by open workbooks
+    return sorted({p for p in paths if not os.path.basename(p).startswith('~$')})
+
+
+def workbook_year(path, df=None):
+    """Year of the ACS vintage, from the file name or the inflation-year row label.
+
+    Without the loaded sheet ``df``, the labels are streamed from the workbook
+    until one names a year, so the sheet is never parsed whole for it.
+    """
+    match = _YEAR_PATTERN.search(os.path.basename(path))
+    if match is None and df is not None:
+        labels = ' '.join(str(label) for label in df.iloc[:, 0].dropna())
+        match = _YEAR_PATTERN.search(labels)
+    elif match is None:
+        from pcid.stream import iter_sheet_rows
+
+        rows = iter_sheet_rows(path)
+        match = next((found for found in (_YEAR_PATTERN.search(str(row[0])) for row in rows if row and row[0])
+                      if found), None)
+        rows.close()
+    return int(match.group(1)) if match else None
+
+
+def geography_level(path):
+    """Geography level named in the file name, defaulting to 'state'."""
+    name = os.path.basename(path).lower()
+    return next((level for level in GEO_LEVELS if level in name), 'state')
+
+
+def process_workbook(path, prune=True):
+    """Ingest one workbook and return its metrics in long format."""
+    df = load_workbook_frame(path, prune=prune)
+    from pcid.export import shortest_float
+
+    wide = build_metrics(df).rename(columns={'State': 'geography'})
+    # melt() widens float32 to float64 digit for digit ('95.0999984741211'); keep the sheet's values
+    for name in wide.columns[wide.dtypes == np.float32]:
+        wide[name] = shortest_float(wide[name])
+    long = wide.melt(id_vars='geography', var_name='metric', value_name='value')
+    long.insert(0, 'geo_level', geography_level(path))
+    long.insert(0, 'year', workbook_year(path, df))
+    return long[LONG_COLUMNS]
+
+
+def run_batch(inputs, max_workers=None):
+    """Process every workbook matched by ``inputs`` in a process pool."""
+    paths = expand_inputs(inputs)
+    if not paths:
+        raise FileNotFoundError(f'No workbooks matched {inputs}')
+    # Workers share cache directories, so stale caches are pruned once all of them are done
+    if len(paths) == 1 or max_workers == 1:
+        frames = [process_workbook(path, prune=False) for path in paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            frames = list(pool.map(process_workbook, paths, [False] * len(paths)))
+    for cache_dir in sorted({cache_dir_for(path) for path in paths}):
+        prune_cache(cache_dir)
+    stacked = pd.concat(frames, ignore_index=True)
+    return stacked.sort_values(['year', 'geo_level', 'geography', 'metric'], kind='stable', ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract metrics from many ACS workbooks into one long table.')
+    parser.add_argument('inputs', nargs='+', help='workbook files, directories or glob patterns')
+    parser.add_argument('--out', default='metrics_long.csv', help='output file (.csv or .parquet)')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    table = run_batch(args.inputs, args.workers)
+    if args.out.endswith('.parquet'):
+        table.to_parquet(args.out, index=False)
+    else:
+        table.to_csv(args.out, index=False)
+    print(f'Wrote {len(table)} rows from {table["year"].nunique()} year(s) to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""A small make-style build graph with content fingerprints.
+
+Each ``Stage`` declares its inputs (other stages), its parameters and the
+code it runs. A stage's key is a hash of all three, with inputs contributing
+the fingerprint of their *content*, so a stage is skipped when its key matches
+the one recorded by the previous build (and its output file still exists).
+Because data stages are fingerprinted by what they produce, a change that
+leaves, say, the top-5 selection unchanged stops there instead of re-rendering
+every chart downstream.
+
+Stale stages that write files are run in a process pool once all of their
+inputs are known.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from pcid import profiling
+
+BUILT = 'built'
+SKIPPED = 'skipped'
+
+
+class Stage:
+    """One node of the build graph.
+
+    ``func`` is called as ``func(**inputs, **params)`` where ``inputs`` maps
+    argument names to upstream stage names. ``output`` marks a stage that
+    writes a file, ``code`` lists extra functions whose source is part of the
+    fingerprint (helpers the stage calls), and ``fingerprint`` is an optional
+    callable returning a string for state outside the graph, such as the
+    digest of a source file.
+    """
+
+    def __init__(self, name, func, inputs=None, params=None, output=None, code=(), fingerprint=None):
+        self.name = name
+        self.func = func
+        self.inputs = dict(inputs or {})
+        self.params = dict(params or {})
+        self.output = output
+        self.code = (func,) + tuple(code)
+        self.fingerprint = fingerprint
+
+
+def _source_hash(func):
+    import inspect
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = f'{getattr(func, "__module__", "")}.{getattr(func, "__qualname__", repr(func))}'
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def content_hash(value):
+    """Fingerprint a stage result by what it contains."""
+    digest = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([[str(c), str(t)] for c, t in value.dtypes.items()]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    else:
+        digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+
+class BuildGraph:
+    """Stages plus the stamp file recording the last successful build."""
+
+    def __init__(self, stamp_path):
+        self.stamp_path = stamp_path
+        self.stages = {}
+        self.values = {}  # Results of the stages computed by the last build()
+
+    def add(self, stage):
+        missing = [name for name in stage.inputs.values() if name not in self.stages]
+        if missing:
+            raise ValueError(f'Stage {stage.name!r} depends on undefined stage(s) {missing}')
+        self.stages[stage.name] = stage
+        return stage
+
+    def _read_stamps(self):
+        try:
+            with open(self.stamp_path) as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_stamps(self, stamps):
+        tmp = f'{self.stamp_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(stamps, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.stamp_path)
+
+    def _ancestors(self, targets):
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for upstream in self.stages[name].inputs.values():
+                visit(upstream)
+            order.append(name)
+
+        for name in targets:
+            visit(name)
+        return order
+
+    def build(self, targets=None, force=False, workers=None):
+        """Bring ``targets`` (default: every stage) up to date.
+
+        Returns ``{stage name: 'built' | 'skipped'}`` in build order.
+        """
+        order = self._ancestors(targets or list(self.stages))
+        old_stamps = self._read_stamps()
+        stamps = dict(old_stamps)
+        values, contents, status = {}, {}, {}
+
+        def value(name):
+            if name not in values:
+                stage = self.stages[name]
+                kwargs = {arg: value(upstream) for arg, upstream in stage.inputs.items()}
+                with profiling.stage(f'build:{name}'):
+                    values[name] = stage.func(**kwargs, **stage.params)
+            return values[name]
+
+        pending = []
+        for name in order:
+            stage = self.stages[name]
+            digest = hashlib.sha256(name.encode())
+            for func in stage.code:
+                digest.update(_source_hash(func).encode())
+            digest.update(repr(sorted(stage.params.items())).encode())
+            if stage.fingerprint is not None:
+                digest.update(str(stage.fingerprint()).encode())
+            for arg, upstream in sorted(stage.inputs.items()):
+                digest.update(f'{arg}={contents[upstream]}'.encode())
+            key = digest.hexdigest()
+
+            stamp = old_stamps.get(name)
+            fresh = stamp is not None and stamp['key'] == key and (stage.output is None or os.path.exists(stage.output))
+            if fresh and not force:
+                contents[name] = stamp['content']
+                status[name] = SKIPPED
+            elif stage.output is None:
+                contents[name] = content_hash(value(name))
+                stamps[name] = {'key': key, 'content': contents[name]}
+                status[name] = BUILT
+            else:
+                contents[name] = key  # A file's content is determined by its key
+                pending.append((stage, key))
+                status[name] = BUILT
+
+        try:
+            self._run_file_stages(pending, value, stamps, workers)
+        finally:
+            self._write_stamps(stamps)  # Keep the stamps of whatever did get built
+            self.values = values
+        return status
+
+    def _run_file_stages(self, pending, value, stamps, workers):
+        if not pending:
+            return
+        calls = [(stage, {arg: value(upstream) for arg, upstream in stage.inputs.items()}, key)
+                 for stage, key in pending]
+        if workers is None:
+            workers = min(len(calls), os.cpu_count() or 1)
+        if workers <= 1 or len(calls) == 1:
+            for stage, kwargs, key in calls:
+                with profiling.stage(f'build:{stage.name}'):
+                    stage.func(**kwargs, **stage.params)
+                stamps[stage.name] = {'key': key, 'content': key}
+            return
+        from concurrent.futures import ProcessPoolExecutor
+        with profiling.stage('build:file_stages'), ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(stage, key, pool.submit(stage.func, **kwargs, **stage.params)) for stage, kwargs, key in calls]
+            for stage, key, future in futures:
+                future.result()
+                stamps[stage.name] = {'key': key, 'content': key}
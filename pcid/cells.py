@@ -0,0 +1,64 @@
+"""Vectorized parser for ACS cell values.
+
+Census tables mix plain numbers with formatting and annotation markers:
+
+==============  =========================================  ==============
+cell            meaning                                    parsed as
+==============  =========================================  ==============
+``1,234``       estimate with thousands separators         1234.0
+``±567``        margin of error                            567.0
+``12.3%``       percentage                                 12.3
+``250,000+``    top-coded value (upper open interval)      250000.0
+``2,500-``      bottom-coded value (lower open interval)   2500.0
+``-12.5``       negative value                             -12.5
+``(X)``, ``N``  not applicable / not available             missing
+``-``           too few sample observations                missing
+``*****``       MOE not appropriate (controlled estimate)  missing
+blank           empty cell                                 missing
+==============  =========================================  ==============
+
+``parse_cells`` handles a whole column in one pass with NumPy's C string
+routines and float parser, returning the values together with a separate
+mask of suppressed or missing cells, rather than silently turning them into
+numbers.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Cells that carry no number once stripped of formatting
+MISSING_TOKENS = ('', '(X)', 'X', 'N', '-', '**', '***', '*****')
+# Formatting characters that never change the value
+_DROP_CHARS = (',', '±', '%', ' ')
+
+
+def parse_cells(cells):
+    """Parse raw ACS cells into ``(values, missing)``.
+
+    ``values`` is a float64 array with NaN wherever ``missing`` (a bool array)
+    is set. Leading minus signs are kept, so negative values stay negative;
+    only the trailing ``+``/``-`` top- and bottom-coding markers are dropped.
+    """
+    cells = np.asarray(cells, dtype=object)
+    shape = cells.shape
+    cells = cells.ravel()
+    missing = pd.isna(cells)
+
+    text = np.where(missing, '', cells).astype(str)
+    text = np.char.strip(text)
+    for char in _DROP_CHARS:
+        text = np.char.replace(text, char, '')
+    missing |= np.isin(text, MISSING_TOKENS)
+    # '250,000+' / '2,500-' are open-ended bounds; a lone '-' was caught above
+    text = np.char.rstrip(text, '+-')
+
+    values = np.full(len(text), np.nan)
+    present = ~missing
+    try:
+        values[present] = text[present].astype(np.float64)
+    except ValueError:
+        # Some unexpected token slipped through; parse leniently and mask it
+        parsed = pd.to_numeric(pd.Series(text[present], dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        values[present] = parsed
+        missing[present] = np.isnan(parsed)
+    return values.reshape(shape), missing.reshape(shape)
@@ -0,0 +1,99 @@
+"""Content-addressed cache of rendered chart images.
+
+A chart image is fully determined by its spec: the chart type, the drawing
+code, the selected rows (states and values), the figure size, the image
+format and the matplotlib version. The cache key is a SHA-256 of that spec,
+and the image bytes are stored under it, so any request for a chart that has
+been drawn before - by this run, an earlier run or another process - is a
+file read instead of a matplotlib render.
+
+The cache is bounded by total size. Every hit refreshes the entry's mtime,
+and once a write pushes the directory past ``max_bytes`` the least recently
+used images are evicted.
+"""
+
+import functools
+import hashlib
+import json
+import os
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+FORMATS = ('png', 'svg')
+
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib_version():
+    # Read from the package metadata, so a cache hit never has to import matplotlib
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version('matplotlib')
+    except PackageNotFoundError:
+        return ''
+
+
+def chart_key(chart, code, top, figsize, fmt, ranked_by=None):
+    """Hex digest identifying the image the ``code`` functions draw for ``top``."""
+    from pcid.build import _source_hash, content_hash
+
+    spec = {
+        'chart': chart,
+        'code': [_source_hash(func) for func in code],
+        'rows': content_hash(top),
+        'figsize': [float(v) for v in figsize],
+        'format': fmt,
+        'matplotlib': _matplotlib_version(),
+    }
+    if ranked_by is not None:  # Only non-default titles, so existing keys stay valid
+        spec['ranked_by'] = ranked_by
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+class ChartCache:
+    """Image bytes stored as ``<key>.<format>`` files in one directory."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, f'{key}.{fmt}')
+
+    def get(self, key, fmt):
+        path = self._path(key, fmt)
+        try:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return data
+
+    def put(self, key, fmt, data):
+        path = self._path(key, fmt)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used images until the cache fits ``max_bytes``."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(FORMATS):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Evicted concurrently by another process
+            total -= size
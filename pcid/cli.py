@@ -0,0 +1,308 @@
+"""Command-line entry point: ``python -m pcid <command> ...``.
+
+    python -m pcid render --charts 1,3 --top 10 --out charts/
+    python -m pcid render --charts 2 --metric Smartphone_Pct
+    python -m pcid export-metrics --out metrics.csv
+    python -m pcid export-tidy --format parquet --out metrics.parquet
+    python -m pcid store load && python -m pcid store top Smartphone_Pct --n 10
+    python -m pcid similar Utah --k 5        # or: python -m pcid similar --clusters 6
+    python -m pcid derive "Fiber_Share=Optic_DSL / est('With an Internet subscription')" --sort
+    python -m pcid bars --series Desktop_Laptop_Pct,Smartphone_Pct --per-panel 13 --out devices.png
+    python -m pcid serve --port 8314
+
+Each command imports what it needs inside its handler, so data-only commands
+such as ``export-metrics`` never load matplotlib.
+"""
+
+import argparse
+import sys
+
+DEFAULT_INPUT = 'P2_Types of computers and internet subscriptions.xlsx'
+
+
+def _chart_list(value):
+    charts = []
+    for item in value.split(','):
+        item = item.strip().removeprefix('visual')
+        if item not in ('1', '2', '3'):
+            raise argparse.ArgumentTypeError(f'unknown chart {item!r}, expected 1, 2 or 3')
+        charts.append('visual' + item)
+    return charts
+
+
+def _lookup_error(exc):
+    """The command-line error for a ``KeyError`` from a metric, row or geography lookup."""
+    return SystemExit(f'pcid-visuals: error: unknown metric or row: {exc.args[0] if exc.args else exc}')
+
+
+def cmd_render(args):
+    import os
+
+    from pcid.build import BUILT
+    from pcid.pipeline import visuals_graph
+
+    if args.metric:
+        from pcid.metrics import load_metrics
+        if args.metric not in load_metrics(args.input).columns[1:]:
+            raise _lookup_error(KeyError(args.metric))
+    os.makedirs(args.out, exist_ok=True)
+    rank_by = {chart: args.metric for chart in args.charts} if args.metric else None
+    if args.watch:
+        from pcid.watch import watch
+        try:
+            watch(args.input, out_dir=args.out, n=args.top, rank_by=rank_by, targets=args.charts)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    graph = visuals_graph(args.input, out_dir=args.out, n=args.top, rank_by=rank_by)
+    status = graph.build(targets=args.charts, force=args.force, workers=args.workers)
+    for chart in args.charts:
+        output = graph.stages[chart].output
+        print(f'{output} ({"rendered" if status[chart] == BUILT else "up to date"})')
+    return 0
+
+
+def cmd_export_metrics(args):
+    from pcid.metrics import load_metrics
+
+    df_metrics = load_metrics(args.input, stream=args.stream)
+    if args.metrics:
+        names = args.metrics.split(',')
+        unknown = [name for name in names if name not in df_metrics.columns[1:]]
+        if unknown:
+            raise _lookup_error(KeyError(', '.join(unknown)))
+        df_metrics = df_metrics[['State'] + names]
+    out = sys.stdout if args.out == '-' else args.out
+    if args.format == 'json':
+        import numpy as np
+
+        from pcid.export import shortest_float
+
+        df_metrics = df_metrics.copy()
+        for name in df_metrics.columns[df_metrics.dtypes == np.float32]:
+            df_metrics[name] = shortest_float(df_metrics[name])
+        df_metrics.to_json(out, orient='records', lines=True)
+    else:
+        df_metrics.to_csv(out, index=False)
+    return 0
+
+
+def cmd_export_tidy(args):
+    from pcid.export import export_tidy
+
+    if args.format == 'parquet' and args.out == '-':
+        raise SystemExit('pcid-visuals: error: Parquet needs an --out file')
+    options = {'compression': args.compression} if args.format == 'parquet' else {}
+    try:
+        export_tidy(args.input, args.out, args.format, year=args.year, **options)
+    except ImportError as exc:
+        raise SystemExit(f'pcid-visuals: error: {exc}') from None
+    return 0
+
+
+def _definition(value):
+    name, sep, expression = value.partition('=')
+    if not sep or not name.strip().isidentifier():
+        raise argparse.ArgumentTypeError(f'expected NAME=EXPRESSION, got {value!r}')
+    return name.strip(), expression.strip()
+
+
+def cmd_derive(args):
+    from pcid.cube import TableCube
+    from pcid.expr import ExpressionError, derive
+    from pcid.ingest import load_workbook_frame
+
+    cube = TableCube.from_frame(load_workbook_frame(args.input))
+    try:
+        derived = derive(cube, dict(args.definitions))
+    except ExpressionError as exc:
+        raise SystemExit(f'pcid-visuals: error: {exc}') from None
+    except KeyError as exc:  # A row label of est(...) and friends
+        raise _lookup_error(exc) from None
+    if args.sort:
+        derived = derived.sort_values(args.definitions[-1][0], ascending=False, kind='stable')
+    derived.to_csv(sys.stdout if args.out == '-' else args.out, index=False)
+    return 0
+
+
+def cmd_store_load(args):
+    from pcid.batch import expand_inputs
+    from pcid.store import connect, load_workbook
+
+    conn = connect(args.db)
+    for path in expand_inputs(args.inputs):
+        rows = load_workbook(conn, path)
+        print(f'{path}: {rows} rows' if rows else f'{path}: already loaded')
+    return 0
+
+
+def cmd_store_top(args):
+    from pcid.store import connect, top_n
+
+    states = [state.strip() for state in args.states.split(',')] if args.states else None
+    try:
+        rows = top_n(connect(args.db), args.metric, args.n, args.year, args.geo_level, states, args.asc)
+    except KeyError as exc:
+        raise _lookup_error(exc) from None
+    for geography, value in rows:
+        print(f'{geography}\t{value:.10g}')
+    return 0
+
+
+def cmd_similar(args):
+    from pcid.cube import TableCube
+    from pcid.ingest import load_workbook_frame
+    from pcid.similar import peer_groups, similar_geographies
+
+    cube = TableCube.from_frame(load_workbook_frame(args.input))
+    if args.clusters:
+        for cluster, names in peer_groups(cube, args.clusters).items():
+            print(f'{cluster + 1}: {", ".join(names)}')
+        return 0
+    if not args.geography:
+        raise SystemExit('pcid-visuals: error: give a geography, or --clusters N')
+    try:
+        peers = similar_geographies(cube, args.geography, args.k)
+    except KeyError as exc:
+        raise SystemExit(f'pcid-visuals: error: unknown geography: {exc.args[0]}') from None
+    for name, distance in peers:
+        print(f'{name}\t{distance:.3f}')
+    return 0
+
+
+def cmd_bars(args):
+    from pcid.bars import render_grouped
+    from pcid.metrics import load_metrics
+
+    df_metrics = load_metrics(args.input)
+    series = args.series.split(',')
+    unknown = sorted(set(series + ([args.sort_by] if args.sort_by else [])) - set(df_metrics.columns[1:]))
+    if unknown:
+        raise _lookup_error(KeyError(', '.join(unknown)))
+    if args.states != 'all':
+        states = [state.strip() for state in args.states.split(',')]
+        unknown = sorted(set(states) - set(df_metrics['State'].astype(str)))
+        if unknown:
+            raise SystemExit(f'pcid-visuals: error: unknown state(s): {", ".join(unknown)}')
+        df_metrics = df_metrics.set_index('State', drop=False).loc[states]
+    if args.sort_by:
+        df_metrics = df_metrics.sort_values(args.sort_by, ascending=False, kind='stable')
+    render_grouped(df_metrics[['State'] + series], series, args.out, per_panel=args.per_panel, ncols=args.ncols,
+                   scale=args.scale, title=args.title, plain_y=True)
+    print(args.out)
+    return 0
+
+
+def cmd_serve(args):
+    import asyncio
+
+    from pcid.service import serve
+
+    try:
+        asyncio.run(serve(args.input, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='pcid-visuals', description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', nargs='?', const='1', metavar='OPTIONS',
+                        help='time pipeline stages (see pcid/profiling.py)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    render = commands.add_parser('render', help='render the charts')
+    render.add_argument('--charts', type=_chart_list, default=_chart_list('1,2,3'),
+                        help='comma-separated charts to render (default: 1,2,3)')
+    render.add_argument('--top', type=int, default=5, help='states per chart (default: 5)')
+    render.add_argument('--metric', help='metrics column to rank the selected charts by instead of their default')
+    render.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    render.add_argument('--out', default='.', help='output directory for the PNGs')
+    render.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    render.add_argument('--force', action='store_true', help='rebuild even if nothing changed')
+    render.add_argument('--watch', action='store_true',
+                        help='keep running and re-render the affected charts whenever the workbook is saved')
+    render.set_defaults(handler=cmd_render)
+
+    export = commands.add_parser('export-metrics', help='write the metrics table (no plotting)')
+    export.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    export.add_argument('--out', default='-', help='output file, or - for stdout (default)')
+    export.add_argument('--format', choices=('csv', 'json'), default='csv', help='csv, or json lines')
+    export.add_argument('--metrics', help='comma-separated subset of metric columns')
+    export.add_argument('--stream', action='store_true', default=None,
+                        help='stream the workbook instead of using the cache')
+    export.set_defaults(handler=cmd_export_metrics)
+
+    tidy = commands.add_parser('export-tidy', help='write the long table (geography, metric, estimate, moe, ...)')
+    tidy.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    tidy.add_argument('--out', default='-', help='output file, or - for stdout (ndjson and csv only)')
+    tidy.add_argument('--format', choices=('parquet', 'ndjson', 'csv'), default='ndjson',
+                      help='parquet (needs pyarrow), newline-delimited json (default) or csv')
+    tidy.add_argument('--compression', default='zstd', help='Parquet codec (default: zstd)')
+    tidy.add_argument('--year', type=int, help='ACS year (default: from the file name or sheet)')
+    tidy.set_defaults(handler=cmd_export_tidy)
+
+    expr = commands.add_parser('derive', help='evaluate derived-metric expressions over the whole table')
+    expr.add_argument('definitions', nargs='+', type=_definition, metavar='NAME=EXPRESSION',
+                      help="e.g. \"Share=est('Satellite Internet service') / est('Total households')\" "
+                           '(see pcid/expr.py)')
+    expr.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    expr.add_argument('--out', default='-', help='output CSV file, or - for stdout (default)')
+    expr.add_argument('--sort', action='store_true', help='order states by the last expression, highest first')
+    expr.set_defaults(handler=cmd_derive)
+
+    store = commands.add_parser('store', help='SQLite metrics store for repeated queries (see pcid/store.py)')
+    store_commands = store.add_subparsers(dest='store_command', required=True)
+    load = store_commands.add_parser('load', help='add workbooks to the store')
+    load.add_argument('inputs', nargs='*', default=[DEFAULT_INPUT], help='workbooks, directories or globs')
+    load.add_argument('--db', help='store file (default: .pcid_cache/metrics.sqlite or $PCID_STORE)')
+    load.set_defaults(handler=cmd_store_load)
+    top = store_commands.add_parser('top', help='top N geographies by a metric')
+    top.add_argument('metric', help='metric name, e.g. Income_75k+_BB_Pct or Optic_Satellite_Gap')
+    top.add_argument('--n', type=int, default=5, help='rows to return (default: 5)')
+    top.add_argument('--year', type=int, help='ACS year (default: latest in the store)')
+    top.add_argument('--geo-level', default='state', help='geography level (default: state)')
+    top.add_argument('--states', help='comma-separated geographies to rank among')
+    top.add_argument('--asc', action='store_true', help='lowest first')
+    top.add_argument('--db', help='store file (default: .pcid_cache/metrics.sqlite or $PCID_STORE)')
+    top.set_defaults(handler=cmd_store_top)
+
+    similar = commands.add_parser('similar', help='geographies with the most similar device/subscription profile')
+    similar.add_argument('geography', nargs='?', help='geography to find peers of, e.g. Utah')
+    similar.add_argument('--k', type=int, default=5, help='peers to list (default: 5)')
+    similar.add_argument('--clusters', type=int, help='instead, split all geographies into N peer groups')
+    similar.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    similar.set_defaults(handler=cmd_similar)
+
+    grouped = commands.add_parser('bars', help='grouped bar chart of any metrics and states')
+    grouped.add_argument('--series', required=True, help='comma-separated metric columns, one bar per state each')
+    grouped.add_argument('--states', default='all', help='comma-separated states (default: all)')
+    grouped.add_argument('--sort-by', help='metric column to order the states by, highest first')
+    grouped.add_argument('--per-panel', type=int, default=None,
+                         help='states per panel; draws a grid of small multiples when there are more')
+    grouped.add_argument('--ncols', type=int, default=1, help='panels per row of the grid (default: 1)')
+    grouped.add_argument('--scale', type=float, default=1, help='divide values by this (e.g. 1e6 for millions)')
+    grouped.add_argument('--title', help='chart title')
+    grouped.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    grouped.add_argument('--out', default='grouped_bars.png', help='output image (.png or .svg)')
+    grouped.set_defaults(handler=cmd_bars)
+
+    serve = commands.add_parser('serve', help='answer metric queries over local HTTP (see pcid/service.py)')
+    serve.add_argument('--input', default=DEFAULT_INPUT, help='Census workbook')
+    serve.add_argument('--host', default='127.0.0.1', help='address to bind (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8314, help='port to listen on (default: 8314)')
+    serve.set_defaults(handler=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.profile:
+        from pcid import profiling
+        profiling.enable(args.profile)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""The whole ACS table as one dense geography x row x role array.
+
+``TableCube.from_frame`` parses every data row of the sheet for every
+geography in one vectorized pass into ``values[geography, row, role]`` (roles
+in the order of ``ROLE_ORDER``: estimate, margin of error, percent, percent
+margin of error), with NaN and a ``missing`` mask for suppressed cells. Rows
+are addressed by the same labels as ``pcid.layout``, so any table row - not
+just the seven the visuals use - is one array lookup away::
+
+    cube = TableCube.from_frame(load_workbook_frame(path))
+    cube.get('Smartphone', 'Percent')       # one value per geography
+
+Derived metrics over the cube are written as expressions, see ``pcid.expr``.
+"""
+
+import numpy as np
+
+from pcid import profiling
+from pcid.cells import parse_cells
+from pcid.extract import NON_STATE_COLUMNS
+from pcid.layout import TableLayout
+
+ROLE_ORDER = ('Estimate', 'Margin of Error', 'Percent', 'Percent Margin of Error')
+
+
+class TableCube:
+    """Parsed cells of every (geography, row, role) of one sheet."""
+
+    def __init__(self, geographies, rows, roles, values, missing, layout):
+        self.geographies = list(geographies)
+        self.rows = np.asarray(rows, dtype=np.intp)  # Sheet row of each cube row
+        self.roles = list(roles)
+        self.values = values
+        self.missing = missing
+        self.layout = layout
+        self._row_index = {row: i for i, row in enumerate(self.rows.tolist())}
+        self._role_index = {role: i for i, role in enumerate(self.roles)}
+
+    @classmethod
+    def from_frame(cls, df, exclude=NON_STATE_COLUMNS, layout=None):
+        """Parse every labelled row of a ``pd.read_excel``-shaped frame."""
+        with profiling.stage('cube'):
+            layout = layout or TableLayout.from_frame(df)
+            geographies, positions = layout.geography_positions(exclude)
+            # Rows behind ambiguous labels are also reachable through their prefixed keys
+            rows = np.array(sorted(set(layout.rows.values())), dtype=np.intp)
+            roles = [role for role in ROLE_ORDER if role in layout.role_offsets]
+            offsets = np.array([layout.role_offsets[role] for role in roles], dtype=np.intp)
+
+            sheet = df.iloc[rows].to_numpy(dtype=object)
+            cells = sheet[np.arange(len(rows))[np.newaxis, :, np.newaxis],
+                          positions[:, np.newaxis, np.newaxis] + offsets[np.newaxis, np.newaxis, :]]
+            profiling.count('values_coerced', cells.size)
+            values, missing = parse_cells(cells)
+        return cls(geographies, rows, roles, values, missing, layout)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def index(self, label, role='Estimate'):
+        """Return the ``(row, role)`` indices of a table cell in the cube."""
+        row = self.layout.row(label)
+        if row not in self._row_index:
+            raise KeyError(f'Row {label!r} is not a data row of the table')
+        if role not in self._role_index:
+            raise KeyError(f'No {role!r} values in the table; have {self.roles}')
+        return self._row_index[row], self._role_index[role]
+
+    def get(self, label, role='Estimate'):
+        """Values of one table cell across all geographies (NaN where missing)."""
+        row, role = self.index(label, role)
+        return self.values[:, row, role]
+
+    def frame(self, columns):
+        """A metrics-style frame from ``{name: (label, role)}`` specs."""
+        import pandas as pd
+
+        data = {'State': pd.Categorical(self.geographies)}
+        data.update({name: self.get(*spec) for name, spec in columns.items()})
+        return pd.DataFrame(data)
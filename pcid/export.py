@@ -0,0 +1,124 @@
+"""Tidy (long) export of the metrics table for warehouse and BI loaders.
+
+One row per (geography, metric), with the metric's estimate, margin of error,
+percent and percent margin of error side by side::
+
+    year  geo_level  geography  metric          estimate   moe     percent  percent_moe
+    2020  state      Alabama    Desktop_Laptop  1301084.0  8701.0  68.9     0.3
+
+Suppressed or missing cells (``(X)``, ``*****``, ...) are written as null.
+``write_parquet`` writes it with compression and per-row-group min/max
+statistics (rows are sorted by metric, so a reader filtering on one metric
+skips the other row groups); it needs the optional ``pyarrow`` package.
+``write_ndjson`` streams it as newline-delimited JSON in bounded chunks.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from pcid.extract import PERCENT_DTYPE
+
+TIDY_COLUMNS = ['year', 'geo_level', 'geography', 'metric', 'estimate', 'moe', 'percent', 'percent_moe']
+# One type for every metric's estimate, so the schema does not depend on which
+# metrics happen to have a missing value: exact for any household count, NaN for missing
+ESTIMATE_DTYPE = np.float64
+
+# Suffix of each value column's source column in the wide metrics frame
+_COMPANIONS = {'estimate': '', 'moe': '_MOE', 'percent': '_Pct', 'percent_moe': '_Pct_MOE'}
+
+
+def base_metrics(df_metrics):
+    """Metric names of the wide frame without their _Pct / _MOE companions."""
+    return [col for col in df_metrics.columns[1:] if not col.endswith(('_Pct', '_MOE'))]
+
+
+def tidy_metrics(df_metrics, year=None, geo_level='state', missing=None):
+    """Reshape the wide metrics frame into the long ``TIDY_COLUMNS`` table.
+
+    ``missing`` is the mask from ``load_metrics(..., with_missing=True)``;
+    the cells it flags, which the metrics frame holds as 0, become NaN (null)
+    so a loader can tell a suppressed value from a real zero.
+    """
+    names = base_metrics(df_metrics)
+    n_geo = len(df_metrics)
+    values = {}
+    for field, suffix in _COMPANIONS.items():
+        block = np.full((len(names), n_geo), np.nan)
+        for i, name in enumerate(names):
+            if name + suffix in df_metrics.columns:
+                block[i] = df_metrics[name + suffix].to_numpy()
+                if missing is not None:
+                    block[i, missing[name + suffix].to_numpy()] = np.nan
+        # Metric-major order: all geographies of the first metric, then the next one
+        column = block.ravel()
+        values[field] = column.astype(ESTIMATE_DTYPE if field == 'estimate' else PERCENT_DTYPE)
+    geographies = df_metrics['State'].astype(str).to_numpy()
+    tidy = pd.DataFrame({
+        'year': pd.array(np.full(n_geo * len(names), year if year is not None else pd.NA), dtype='Int16'),
+        'geo_level': pd.Categorical([geo_level] * (n_geo * len(names))),
+        'geography': pd.Categorical(np.tile(geographies, len(names)), categories=sorted(set(geographies))),
+        'metric': pd.Categorical(np.repeat(names, n_geo), categories=names),
+        **values,
+    })
+    return tidy[TIDY_COLUMNS]
+
+
+def write_parquet(tidy, path, compression='zstd', row_group_size=65536):
+    """Write ``tidy`` to Parquet with ``compression`` and column statistics."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Parquet export needs the optional pyarrow package: pip install pyarrow') from None
+    table = pa.Table.from_pandas(tidy, preserve_index=False)
+    pq.write_table(table, path, compression=compression, row_group_size=row_group_size,
+                   write_statistics=True, use_dictionary=['geo_level', 'geography', 'metric'])
+    return path
+
+
+def shortest_float(values):
+    """float32 values as float64 at their shortest repr, so 96.4 is not stored as 96.4000015."""
+    return np.asarray(values).astype(str).astype(np.float64)
+
+
+def iter_ndjson(tidy, chunk_rows=10000):
+    """Yield ``tidy`` as newline-delimited JSON text, ``chunk_rows`` records at a time."""
+    for start in range(0, len(tidy), chunk_rows):
+        chunk = tidy.iloc[start:start + chunk_rows].copy()
+        for col in chunk.columns:
+            if chunk[col].dtype == np.float32:
+                chunk[col] = shortest_float(chunk[col])
+        text = chunk.to_json(orient='records', lines=True)
+        yield text if text.endswith('\n') else text + '\n'
+
+
+def write_ndjson(tidy, out, chunk_rows=10000):
+    """Stream ``tidy`` to ``out`` (a path, '-' for stdout, or an open text file)."""
+    if out == '-':
+        out = sys.stdout
+    if isinstance(out, str):
+        with open(out, 'w') as fh:
+            return write_ndjson(tidy, fh, chunk_rows)
+    for text in iter_ndjson(tidy, chunk_rows):
+        out.write(text)
+    return len(tidy)
+
+
+def export_tidy(path, out, fmt='parquet', year=None, geo_level=None, **options):
+    """Load the metrics of workbook ``path`` and write them in tidy form to ``out``."""
+    from pcid.batch import geography_level, workbook_year
+    from pcid.metrics import load_metrics
+
+    if year is None:
+        year = workbook_year(path)
+    df_metrics, missing = load_metrics(path, with_missing=True)
+    tidy = tidy_metrics(df_metrics, year, geo_level or geography_level(path), missing)
+    if fmt == 'parquet':
+        return write_parquet(tidy, out, **options)
+    if fmt == 'ndjson':
+        return write_ndjson(tidy, out, **options)
+    if fmt == 'csv':
+        return tidy.to_csv(sys.stdout if out == '-' else out, index=False)
+    raise ValueError(f'unknown export format {fmt!r}, expected parquet, ndjson or csv')
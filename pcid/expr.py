@@ -0,0 +1,163 @@
+"""Derived-metric expressions evaluated over the whole ``TableCube``.
+
+An expression is a small Python-syntax formula over table cells, e.g.::
+
+    'Fiber_Share': "est('Broadband such as cable, fiber optic or DSL') / est('With an Internet subscription')"
+    'Rich_Poor_Gap': "pct('$75,000 or more / With a broadband Internet subscription')"
+                     " - pct('Less than $20,000 / With a broadband Internet subscription')"
+    'Gap_MOE': "moe_sum(moe('Broadband such as cable, fiber optic or DSL'), moe('Satellite Internet service'))"
+
+``est``, ``moe``, ``pct`` and ``pct_moe`` read one row label's estimate,
+margin of error, percent and percent margin of error for every geography at
+once; arithmetic then runs on whole arrays. Bare names refer to metrics in
+``pcid.metrics.METRICS`` (``Optic_DSL - Satellite``) or to expressions
+defined earlier in the same ``derive`` call. Metric names that are not
+Python identifiers, such as ``Income_75k+_BB_Pct`` or ``Income_20k-75k_BB``,
+would parse as arithmetic and have to be read through their row label
+instead (``pct('$75,000 or more / With a broadband Internet subscription')``);
+the error for such a name says which call to write.
+
+Expressions are parsed with ``ast`` and only numbers, names, arithmetic,
+comparisons and the functions in ``FUNCTIONS`` are accepted; nothing is
+passed to ``eval``. Division by zero yields NaN rather than an error.
+"""
+
+import ast
+import functools
+import operator
+
+import numpy as np
+
+from pcid import moe as _moe
+
+CELL_FUNCTIONS = {
+    'est': 'Estimate',
+    'moe': 'Margin of Error',
+    'pct': 'Percent',
+    'pct_moe': 'Percent Margin of Error',
+}
+
+FUNCTIONS = {
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'moe_sum': _moe.moe_sum,
+    'moe_ratio': _moe.moe_ratio,
+    'moe_proportion': _moe.moe_proportion,
+}
+
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.Pow: operator.pow,
+}
+_CELL_FUNCTION_OF_ROLE = {role: name for name, role in CELL_FUNCTIONS.items()}
+_UNARY = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_COMPARE = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+
+
+class ExpressionError(ValueError):
+    """An expression that does not parse or uses something not allowed."""
+
+
+@functools.lru_cache(maxsize=256)
+def parse(expression):
+    """Parse and validate ``expression``; returns its AST."""
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as exc:
+        raise ExpressionError(f'Cannot parse {expression!r}: {exc.msg}') from None
+    labels = set()  # The quoted row labels of est(...) and friends, the only strings allowed
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise ExpressionError(f'Only plain calls such as est(...) are allowed in {expression!r}')
+            name = node.func.id
+            if name in CELL_FUNCTIONS:
+                if len(node.args) != 1 or not (isinstance(node.args[0], ast.Constant)
+                                               and isinstance(node.args[0].value, str)):
+                    raise ExpressionError(f'{name}() takes one quoted row label, in {expression!r}')
+                labels.add(id(node.args[0]))
+            elif name not in FUNCTIONS:
+                raise ExpressionError(f'Unknown function {name!r} in {expression!r}')
+        elif isinstance(node, ast.Constant):
+            if id(node) not in labels and (not isinstance(node.value, (int, float)) or isinstance(node.value, bool)):
+                raise ExpressionError(f'Unsupported constant {node.value!r} in {expression!r}')
+        elif not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Name, ast.Load,
+                                   *_BINARY, *_UNARY, *_COMPARE)):
+            raise ExpressionError(f'{type(node).__name__} is not allowed in {expression!r}')
+    return tree
+
+
+def _unknown_name(name, names):
+    # 'Income_75k+_BB_Pct' parses as Income_75k + _BB_Pct: name the calls that read such metrics
+    calls = [f"{_CELL_FUNCTION_OF_ROLE[spec[1]]}({spec[0]!r}) for {full}" for full, spec in names.items()
+             if full.startswith(name) and not full.isidentifier()
+             and isinstance(spec, tuple) and spec[1] in _CELL_FUNCTION_OF_ROLE]
+    if not calls:
+        return f'Unknown metric {name!r}'
+    return (f"Unknown metric {name!r}; names with '+' or '-' cannot be written bare, use "
+            + ', '.join(calls))
+
+
+def _evaluate(node, cube, names):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, cube, names)
+    if isinstance(node, ast.Constant):
+        return np.float64(node.value)  # So 10 ** 10 ** 10 overflows to inf instead of running forever
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise ExpressionError(_unknown_name(node.id, names))
+        value = names[node.id]
+        return cube.get(*value) if isinstance(value, tuple) else value
+    if isinstance(node, ast.BinOp):
+        return _BINARY[type(node.op)](_evaluate(node.left, cube, names), _evaluate(node.right, cube, names))
+    if isinstance(node, ast.UnaryOp):
+        return _UNARY[type(node.op)](_evaluate(node.operand, cube, names))
+    if isinstance(node, ast.Compare):
+        left, result = _evaluate(node.left, cube, names), True
+        for op, comparator in zip(node.ops, node.comparators):
+            right = _evaluate(comparator, cube, names)
+            result = result & _COMPARE[type(op)](left, right)
+            left = right
+        return result
+    name = node.func.id
+    if name in CELL_FUNCTIONS:
+        return cube.get(node.args[0].value, CELL_FUNCTIONS[name])
+    return FUNCTIONS[name](*[_evaluate(arg, cube, names) for arg in node.args])
+
+
+def evaluate(expression, cube, names=None):
+    """Evaluate ``expression`` over every geography of ``cube``.
+
+    ``names`` maps bare names to arrays or to ``(label, role)`` specs.
+    Returns a float64 array with one value per geography.
+    """
+    tree = parse(expression)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        result = _evaluate(tree, cube, names or {})
+    result = np.broadcast_to(np.asarray(result, dtype=np.float64), (len(cube.geographies),))
+    # x / 0 gives inf; report it as missing like any other undefined value
+    return np.where(np.isinf(result), np.nan, result)
+
+
+def derive(cube, expressions, names=None):
+    """Evaluate ``{name: expression}`` in order; returns a frame of State + each name.
+
+    Later expressions may refer to earlier ones by name. ``names`` defaults to
+    the metric specs in ``pcid.metrics.METRICS``.
+    """
+    import pandas as pd
+
+    if names is None:
+        from pcid.metrics import METRICS
+        names = METRICS
+    names = dict(names)
+    frame = {'State': pd.Categorical(cube.geographies)}
+    for name, expression in expressions.items():
+        frame[name] = names[name] = evaluate(expression, cube, names)
+    return pd.DataFrame(frame)
@@ -0,0 +1,104 @@
+"""Vectorized extraction of per-state metrics from the Census sheet.
+
+Every geography in the sheet owns a block of four columns (Total estimate,
+Total margin of error, Percent estimate, Percent margin of error). A metric
+is addressed as ``(row_idx, col_offset)`` relative to the first column of
+that block (``pcid.layout`` resolves these from row labels), like the old
+``get_val(row_idx, col_offset)`` helper, but all geographies x metrics are
+gathered with one fancy-indexing operation and parsed with one vectorized
+pass of ``pcid.cells.parse_cells``.
+
+The result is stored compactly: household counts as int32, percentages as
+float32 and the geography names as a categorical, each column preallocated
+and filled straight from the cleaned block.
+"""
+
+import numpy as np
+import pandas as pd
+
+from pcid import profiling
+from pcid.cells import parse_cells
+
+# Columns that are not geographies, on top of the 'Unnamed: n' block fillers
+NON_STATE_COLUMNS = ['Individual State', 'Puerto Rico', 'Totals and Percentages ']
+
+COUNT_DTYPE = np.int32
+PERCENT_DTYPE = np.float32
+# Column roles (and their offsets within a block) that hold household counts
+COUNT_ROLES = ('Estimate', 'Margin of Error')
+COUNT_OFFSETS = (0, 1)
+
+
+def state_columns(df, exclude=NON_STATE_COLUMNS):
+    """Return the geography names and the integer position of each block."""
+    names = [col for col in df.columns if not str(col).startswith('Unnamed') and col not in exclude]
+    positions = np.array([df.columns.get_loc(name) for name in names], dtype=np.intp)
+    return names, positions
+
+
+def metric_dtype(spec):
+    """Storage dtype of a metric spec: int32 for counts, float32 for percentages."""
+    _, role = spec
+    is_count = role in COUNT_OFFSETS if isinstance(role, (int, np.integer)) else role in COUNT_ROLES
+    return COUNT_DTYPE if is_count else PERCENT_DTYPE
+
+
+def extract_metrics(df, metrics, derived=None, exclude=NON_STATE_COLUMNS, layout=None, with_missing=False):
+    """Build the ``df_metrics`` frame for every geography in one pass.
+
+    ``metrics`` maps output column name -> ``(row_idx, col_offset)``, or
+    ``(row_label, column_role)`` when a ``pcid.layout.TableLayout`` is given.
+    ``derived`` optionally maps output column name -> callable taking the
+    frame built so far, e.g. ``lambda m: m['Optic_DSL'] - m['Satellite']``.
+
+    Suppressed or missing cells (``(X)``, ``N``, ``-``, blanks, ...) are stored
+    as 0. With ``with_missing`` a second, boolean frame of the same shape is
+    returned that flags them.
+    """
+    with profiling.stage('extract'):
+        return _extract_metrics(df, metrics, derived, exclude, layout, with_missing)
+
+
+def _extract_metrics(df, metrics, derived, exclude, layout, with_missing):
+    dtypes = [metric_dtype(spec) for spec in metrics.values()]
+    if layout is not None:
+        metrics = layout.resolve(metrics)
+        names, positions = layout.geography_positions(exclude)
+    else:
+        names, positions = state_columns(df, exclude)
+    rows = np.array([row for row, _ in metrics.values()], dtype=np.intp)
+    offsets = np.array([offset for _, offset in metrics.values()], dtype=np.intp)
+
+    # (geographies, metrics) block of raw cells picked out in a single take,
+    # copying only the sheet rows that are actually used
+    used_rows, row_pos = np.unique(rows, return_inverse=True)
+    sheet = df.iloc[used_rows].to_numpy(dtype=object)
+    cells = sheet[row_pos[np.newaxis, :], positions[:, np.newaxis] + offsets[np.newaxis, :]]
+    return frame_from_cells(names, cells, list(metrics), dtypes, derived, with_missing)
+
+
+def frame_from_cells(names, cells, columns, dtypes, derived=None, with_missing=False):
+    """Clean a (geographies, metrics) block of raw cells into the typed metrics frame."""
+    with profiling.stage('clean'):
+        profiling.count('values_coerced', cells.size)
+        values, missing = parse_cells(cells)
+
+    frame = {'State': pd.Categorical(names)}
+    for j, (name, dtype) in enumerate(zip(columns, dtypes)):
+        column = np.empty(len(names), dtype=dtype)
+        column[:] = np.where(missing[:, j], 0, values[:, j])
+        frame[name] = column
+    df_metrics = pd.DataFrame(frame, copy=False)
+    for name, func in (derived or {}).items():
+        df_metrics[name] = func(df_metrics)
+    if not with_missing:
+        return df_metrics
+
+    # A derived metric is missing wherever evaluating it on NaN-for-missing inputs gives NaN
+    with_nan = pd.DataFrame(values, columns=columns)
+    flags = pd.DataFrame(missing, columns=columns)
+    for name, func in (derived or {}).items():
+        with_nan[name] = func(with_nan)
+        flags[name] = with_nan[name].isna().to_numpy()
+    flags.insert(0, 'State', df_metrics['State'])
+    return df_metrics, flags
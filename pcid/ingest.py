@@ -0,0 +1,207 @@
+"""Cached ingest of the Census workbook.
+
+Parsing the .xlsx with openpyxl is by far the slowest step of every run, so
+the sheet is converted once into a compact cache: the data cells, parsed to
+numbers, as one float64 NumPy array (``.npy``, 8 bytes a cell however long the
+labels are), and the row labels, column names and the few text cells left
+(header rows, section titles, ``(X)`` markers) in a JSON file next to it. The
+cache is keyed on the SHA-256 of the workbook; the file's mtime and size are
+recorded alongside so an unchanged file can be validated without re-hashing it.
+
+Several processes may share one cache directory (see ``pcid.batch``): index
+updates are merged under a file lock, and cache files are written to
+per-process temporary names and moved into place.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from pcid import profiling
+from pcid.cells import parse_cells
+
+DEFAULT_WORKBOOK = 'P2_Types of computers and internet subscriptions.xlsx'
+CACHE_DIRNAME = '.pcid_cache'
+CACHE_VERSION = 2
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(path, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = os.environ.get('PCID_CACHE_DIR') or os.path.join(
+            os.path.dirname(os.path.abspath(path)), CACHE_DIRNAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return {'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+
+def _index_path(cache_dir):
+    return os.path.join(cache_dir, 'index.json')
+
+
+def _read_index(cache_dir):
+    try:
+        with open(_index_path(cache_dir)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+@contextlib.contextmanager
+def _index_lock(cache_dir):
+    # Serializes read-modify-write of the index between processes
+    with open(_index_path(cache_dir) + '.lock', 'a+b') as fh:
+        if os.name == 'nt':
+            import msvcrt
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _write_json(path, data, **options):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(data, fh, **options)
+    os.replace(tmp, path)
+
+
+def _update_index(cache_dir, key, entry):
+    # Merge into the index as it is now, not as it was when this process read it
+    with _index_lock(cache_dir):
+        index = _read_index(cache_dir)
+        index[key] = entry
+        _write_json(_index_path(cache_dir), index, indent=2, sort_keys=True)
+
+
+def source_digest(path, cache_dir=None):
+    """Return the workbook's SHA-256, reusing the cached one if mtime/size match."""
+    cache_dir = cache_dir_for(path, cache_dir)
+    key = os.path.abspath(path)
+    stat = _stat_key(path)
+    entry = _read_index(cache_dir).get(key)
+    if entry and entry.get('mtime_ns') == stat['mtime_ns'] and entry.get('size') == stat['size']:
+        return entry['sha256']
+    with profiling.stage('hash_workbook'):
+        sha = file_digest(path)
+    _update_index(cache_dir, key, dict(stat, sha256=sha))
+    return sha
+
+
+def _cache_paths(cache_dir, sha):
+    stem = os.path.join(cache_dir, f'sheet-{sha[:24]}-v{CACHE_VERSION}')
+    return stem + '.npy', stem + '.json'
+
+
+def _encode(df):
+    # Data cells as numbers (NaN where a cell holds none); the text cells that
+    # are not numbers are kept verbatim as [row, column, text]
+    cells = df.iloc[:, 1:].to_numpy(dtype=object)
+    values, missing = parse_cells(cells)
+    rows, cols = np.nonzero(missing & pd.notna(cells))
+    labels = df.iloc[:, 0].tolist()
+    meta = {
+        'columns': [str(c) for c in df.columns],
+        'labels': [None if pd.isna(label) else str(label) for label in labels],
+        'text': [[int(r), int(c), str(cells[r, c])] for r, c in zip(rows, cols)],
+    }
+    return values, meta
+
+
+def _decode(values, meta):
+    cells = np.empty((values.shape[0], values.shape[1] + 1), dtype=object)
+    cells[:, 0] = [np.nan if label is None else label for label in meta['labels']]
+    cells[:, 1:] = values
+    cells[:, 1:][np.isnan(values)] = np.nan
+    for row, col, text in meta['text']:
+        cells[row, col + 1] = text
+    return pd.DataFrame(cells, columns=meta['columns'], dtype=object)
+
+
+def _write_cache(values, meta, array_path, meta_path, sha):
+    tmp = f'{array_path}.{os.getpid()}.tmp.npy'
+    np.save(tmp, values)
+    os.replace(tmp, array_path)
+    _write_json(meta_path, dict(meta, sha256=sha))
+
+
+def _read_cache(array_path, meta_path):
+    with open(meta_path) as fh:
+        meta = json.load(fh)
+    values = np.load(array_path)
+    if values.dtype != np.float64 or values.shape != (len(meta['labels']), len(meta['columns']) - 1):
+        raise ValueError(f'{array_path} does not match {meta_path}')
+    return _decode(values, meta)
+
+
+def load_workbook_frame(path=DEFAULT_WORKBOOK, cache_dir=None, refresh=False, prune=True):
+    """Load the workbook as ``pd.read_excel`` would, going through the cache.
+
+    The frame holds every cell in a single object-dtype block, so row slices
+    and ``to_numpy()`` stay cheap on very wide sheets. Data cells hold their
+    parsed value (``'1,234'`` is 1234.0, ``'12.3%'`` 12.3) and every other cell
+    its text, the same whether the frame was parsed or read back from the
+    cache; ``pcid.cells.parse_cells`` reads both forms. The cache is rebuilt
+    automatically whenever the workbook's contents change, or unconditionally
+    when ``refresh`` is true. After a rebuild, caches of workbook versions no
+    longer indexed are removed unless ``prune`` is false (batch workers leave
+    that to the parent process, see ``prune_cache``).
+    """
+    with profiling.stage('ingest'):
+        cache_dir = cache_dir_for(path, cache_dir)
+        sha = source_digest(path, cache_dir)
+        array_path, meta_path = _cache_paths(cache_dir, sha)
+        if not refresh and os.path.exists(array_path) and os.path.exists(meta_path):
+            try:
+                with profiling.stage('cache_load'):
+                    return _read_cache(array_path, meta_path)
+            except (OSError, ValueError):
+                pass  # Corrupt or truncated cache entry, fall through and rebuild it
+        with profiling.stage('read_excel'):
+            df = pd.read_excel(path, dtype=object)
+        profiling.count('cells_parsed', df.size)
+        with profiling.stage('cache_write'):
+            values, meta = _encode(df)
+            _write_cache(values, meta, array_path, meta_path, sha)
+            if prune:
+                prune_cache(cache_dir)
+        return _decode(values, meta)
+
+
+def prune_cache(cache_dir):
+    """Drop sheet caches of workbook versions that no indexed source points at anymore."""
+    with _index_lock(cache_dir):
+        live = {entry['sha256'][:24] for entry in _read_index(cache_dir).values()}
+    for name in os.listdir(cache_dir):
+        # '.tmp' files are another process's cache write still in flight
+        if name.startswith('sheet-') and '.tmp' not in name and name.split('-')[1] not in live:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
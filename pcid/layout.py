@@ -0,0 +1,133 @@
+"""Label-driven index over the Census sheet layout.
+
+Rather than hard-coding row numbers and the "percent is 2 columns over"
+offset, ``TableLayout`` scans the sheet once and maps
+
+* row labels (``'Smartphone'``, ``'Satellite Internet service'``, ...) to
+  row positions, and
+* column roles (``'Estimate'``, ``'Margin of Error'``, ``'Percent'``,
+  ``'Percent Margin of Error'``) to offsets inside each geography's block,
+
+so every later lookup is a dict access. Labels that repeat in the table (the
+income brackets all have a "With a broadband Internet subscription" row) are
+addressed with their group or section as a prefix, e.g.
+``'$75,000 or more / With a broadband Internet subscription'``.
+"""
+
+import numpy as np
+
+from pcid.extract import NON_STATE_COLUMNS
+
+SEPARATOR = ' / '
+
+# (header group, header role) pairs as they appear in the two header rows
+ROLES = {
+    ('Total', 'Estimate'): 'Estimate',
+    ('Total', 'Margin of Error'): 'Margin of Error',
+    ('Percent', 'Estimate'): 'Percent',
+    ('Percent', 'Margin of Error'): 'Percent Margin of Error',
+}
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+class TableLayout:
+    """Positions of rows, column roles and geographies in one sheet."""
+
+    def __init__(self, columns, labels, group_row, role_row, first_row, empty_rows=()):
+        self.columns = [str(col) for col in columns]
+        self.labels = [_text(label) for label in labels]
+
+        named = [(pos, col) for pos, col in enumerate(self.columns) if col and not col.startswith('Unnamed')][1:]
+        self.geographies = [col for _, col in named]
+        self.positions = {col: pos for pos, col in named}
+        self.role_offsets = self._scan_roles(group_row, role_row)
+        self.rows, self.ambiguous = self._scan_rows(first_row, set(empty_rows))
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build the layout of a frame shaped like ``pd.read_excel`` output."""
+        labels = df.iloc[:, 0].tolist()
+        role_row = next(i for i, label in enumerate(labels) if _text(label) == 'Label')
+        data = df.iloc[:, 1:]
+        empty_rows = np.flatnonzero(data.isna().all(axis=1).to_numpy())
+        return cls(df.columns, labels, df.iloc[role_row - 1].tolist(), df.iloc[role_row].tolist(),
+                   role_row + 1, empty_rows)
+
+    def _scan_roles(self, group_row, role_row):
+        # Read the role of each column of the first geography block
+        start = self.positions[self.geographies[0]]
+        stop = self.positions[self.geographies[1]] if len(self.geographies) > 1 else len(self.columns)
+        offsets = {}
+        group = ''
+        for offset, col in enumerate(range(start, stop)):
+            group = _text(group_row[col]) or group  # Group headers span their columns
+            role = ROLES.get((group, _text(role_row[col])))
+            if role is not None:
+                offsets[role] = offset
+        if 'Estimate' not in offsets:
+            raise ValueError('Could not find the Estimate column in the sheet header')
+        return offsets
+
+    def _scan_rows(self, first_row, empty_rows):
+        keys = {}
+        section = group = ''
+        for row in range(first_row, len(self.labels)):
+            label = self.labels[row]
+            if not label:
+                continue
+            if row in empty_rows:  # Section heading such as 'TYPES OF COMPUTER'
+                section, group = label, ''
+                continue
+            name = label.rstrip(':')
+            if label.endswith(':'):  # Group headers ('$75,000 or more:') are siblings, not nested
+                group = ''
+            candidates = [name]
+            for prefix in (group, section):
+                if prefix:
+                    candidates.append(prefix + SEPARATOR + name)
+            for key in candidates:
+                keys.setdefault(key, []).append(row)
+            if label.endswith(':'):
+                group = name
+
+        rows = {key: found[0] for key, found in keys.items() if len(set(found)) == 1}
+        ambiguous = {key: found for key, found in keys.items() if len(set(found)) > 1}
+        return rows, ambiguous
+
+    def row(self, label):
+        """Return the row position of ``label`` (an int is passed through)."""
+        if isinstance(label, (int, np.integer)):
+            return int(label)
+        try:
+            return self.rows[label]
+        except KeyError:
+            if label in self.ambiguous:
+                options = [key for key, row in self.rows.items()
+                           if key.endswith(SEPARATOR + label) and row in self.ambiguous[label]]
+                raise KeyError(f'Row label {label!r} is ambiguous, use one of {options}') from None
+            raise KeyError(f'No row labelled {label!r} in the sheet') from None
+
+    def offset(self, role):
+        """Return the column offset of ``role`` (an int is passed through)."""
+        if isinstance(role, (int, np.integer)):
+            return int(role)
+        try:
+            return self.role_offsets[role]
+        except KeyError:
+            raise KeyError(f'No {role!r} column in the sheet; have {list(self.role_offsets)}') from None
+
+    def locate(self, label, role='Estimate'):
+        """Return ``(row_idx, col_offset)`` for a label and column role."""
+        return self.row(label), self.offset(role)
+
+    def resolve(self, metrics):
+        """Map ``{name: (label, role)}`` to ``{name: (row_idx, col_offset)}``."""
+        return {name: self.locate(*spec) for name, spec in metrics.items()}
+
+    def geography_positions(self, exclude=NON_STATE_COLUMNS):
+        """Return the geography names and the position of each block."""
+        names = [name for name in self.geographies if name not in exclude]
+        return names, np.array([self.positions[name] for name in names], dtype=np.intp)
@@ -0,0 +1,94 @@
+"""The shared metrics frame used by every visual.
+
+``load_metrics()`` reads the workbook through the ingest cache, extracts the
+full metric catalogue for every state and memoizes the result for the life of
+the process, so running several charts costs a single parse. The returned
+frame is shared between callers and must be treated as read-only.
+"""
+
+import functools
+import os
+
+import numpy as np
+
+from pcid.extract import extract_metrics
+from pcid.ingest import DEFAULT_WORKBOOK, load_workbook_frame, source_digest
+from pcid.layout import TableLayout
+from pcid.moe import moe_sum
+from pcid.stream import stream_metrics
+
+# Workbooks above this size are streamed rather than fully parsed and cached
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# Every metric any of the visuals uses, as (row label, column role).
+# See pcid.layout for how labels and roles are resolved to sheet positions.
+_BROADBAND = 'With a broadband Internet subscription'
+METRICS = {
+    # Device ownership
+    'Desktop_Laptop': ('Desktop or laptop', 'Estimate'),
+    'Desktop_Laptop_Pct': ('Desktop or laptop', 'Percent'),
+    'Smartphone': ('Smartphone', 'Estimate'),
+    'Smartphone_Pct': ('Smartphone', 'Percent'),
+    # Subscription type
+    'Optic_DSL': ('Broadband such as cable, fiber optic or DSL', 'Estimate'),
+    'Optic_DSL_Pct': ('Broadband such as cable, fiber optic or DSL', 'Percent'),
+    'Satellite': ('Satellite Internet service', 'Estimate'),
+    'Satellite_Pct': ('Satellite Internet service', 'Percent'),
+    # Broadband subscriptions by household income bracket
+    'Income_Under20k_BB': ('Less than $20,000 / ' + _BROADBAND, 'Estimate'),
+    'Income_Under20k_BB_Pct': ('Less than $20,000 / ' + _BROADBAND, 'Percent'),
+    'Income_20k-75k_BB': ('$20,000 to $74,999 / ' + _BROADBAND, 'Estimate'),
+    'Income_20k-75k_BB_Pct': ('$20,000 to $74,999 / ' + _BROADBAND, 'Percent'),
+    'Income_75k+_BB': ('$75,000 or more / ' + _BROADBAND, 'Estimate'),
+    'Income_75k+_BB_Pct': ('$75,000 or more / ' + _BROADBAND, 'Percent'),
+}
+
+# The 90% margin of error of every metric above, as '<name>_MOE'
+_MOE_ROLES = {'Estimate': 'Margin of Error', 'Percent': 'Percent Margin of Error'}
+METRICS.update({f'{name}_MOE': (label, _MOE_ROLES[role]) for name, (label, role) in list(METRICS.items())})
+
+DERIVED = {
+    'Optic_Satellite_Gap': lambda m: m['Optic_DSL'] - m['Satellite'],
+    'Optic_Satellite_Gap_Pct': lambda m: m['Optic_DSL_Pct'] - m['Satellite_Pct'],
+    # Differences combine MOEs as the root sum of squares (see pcid.moe)
+    'Optic_Satellite_Gap_MOE': lambda m: moe_sum(m['Optic_DSL_MOE'], m['Satellite_MOE']).astype(np.float32),
+    'Optic_Satellite_Gap_Pct_MOE': lambda m: moe_sum(m['Optic_DSL_Pct_MOE'], m['Satellite_Pct_MOE']).astype(np.float32),
+}
+
+
+def build_metrics(df, with_missing=False):
+    """Extract the full metric catalogue from an already loaded sheet.
+
+    Suppressed or missing cells are 0 in the frame; ``with_missing`` also
+    returns the boolean frame that flags them (see ``extract_metrics``).
+    """
+    return extract_metrics(df, METRICS, derived=DERIVED, layout=TableLayout.from_frame(df), with_missing=with_missing)
+
+
+@functools.lru_cache(maxsize=8)
+def _metrics_for(path, sha256, stream):
+    # sha256 is only part of the memo key, so an edited workbook is re-read
+    if stream:
+        return stream_metrics(path, METRICS, derived=DERIVED, with_missing=True)
+    return build_metrics(load_workbook_frame(path), with_missing=True)
+
+
+def load_metrics(path=DEFAULT_WORKBOOK, stream=None, with_missing=False):
+    """Return the memoized metrics frame for ``path`` (one row per state).
+
+    ``stream`` selects the streaming reader (``pcid.stream``), which reads only
+    the rows the metrics need instead of caching the whole sheet; by default it
+    is used for workbooks larger than ``STREAM_THRESHOLD_BYTES``. With
+    ``with_missing`` the result is ``(df_metrics, missing)``, where ``missing``
+    flags the suppressed or missing cells that the frame holds as 0.
+    """
+    path = os.path.abspath(path)
+    if stream is None:
+        stream = os.path.getsize(path) > STREAM_THRESHOLD_BYTES
+    df_metrics, missing = _metrics_for(path, source_digest(path), bool(stream))
+    return (df_metrics, missing) if with_missing else df_metrics
+
+
+def clear_cache():
+    """Forget every memoized metrics frame."""
+    _metrics_for.cache_clear()
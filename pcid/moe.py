@@ -0,0 +1,148 @@
+"""Margins of error, confidence intervals and significance-aware rankings.
+
+ACS margins of error are published at the 90% confidence level. Everything
+here works on whole arrays (or Series) at once, following the formulas in the
+Census Bureau's *Understanding and Using ACS Data*, chapter 8:
+
+* sums and differences:  MOE = sqrt(MOE_1^2 + MOE_2^2 + ...)
+* ratios:                MOE = sqrt(MOE_num^2 + r^2 * MOE_den^2) / den
+* proportions:           MOE = sqrt(MOE_num^2 - p^2 * MOE_den^2) / den
+  (falling back to the ratio formula where the radicand is negative)
+* two estimates differ significantly at 90% when
+  |est_1 - est_2| > sqrt(MOE_1^2 + MOE_2^2)
+"""
+
+import numpy as np
+import pandas as pd
+
+Z_90 = 1.645
+
+
+def _z(level):
+    from statistics import NormalDist
+    return NormalDist().inv_cdf(0.5 + level / 2)
+
+
+def standard_error(moe):
+    """Standard error of an estimate from its published 90% MOE."""
+    return np.asarray(moe, dtype=np.float64) / Z_90
+
+
+def rescale_moe(moe, level):
+    """MOE at another confidence level (e.g. 0.95) from the published 90% MOE."""
+    return standard_error(moe) * _z(level)
+
+
+def confidence_interval(estimate, moe, level=0.90):
+    """Lower and upper bounds of the confidence interval at ``level``."""
+    estimate = np.asarray(estimate, dtype=np.float64)
+    half = np.asarray(moe, dtype=np.float64) if level == 0.90 else rescale_moe(moe, level)
+    return estimate - half, estimate + half
+
+
+def moe_sum(*moes):
+    """MOE of a sum or difference of estimates."""
+    total = sum(np.square(np.asarray(moe, dtype=np.float64)) for moe in moes)
+    return np.sqrt(total)
+
+
+def moe_ratio(numerator, denominator, moe_numerator, moe_denominator):
+    """MOE of ``numerator / denominator`` when the numerator is not a subset."""
+    num, den, moe_n, moe_d = (np.asarray(x, dtype=np.float64) for x in
+                              (numerator, denominator, moe_numerator, moe_denominator))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = num / den
+        return np.sqrt(moe_n ** 2 + ratio ** 2 * moe_d ** 2) / den
+
+
+def moe_proportion(numerator, denominator, moe_numerator, moe_denominator):
+    """MOE of a proportion, where the numerator is a subset of the denominator."""
+    num, den, moe_n, moe_d = (np.asarray(x, dtype=np.float64) for x in
+                              (numerator, denominator, moe_numerator, moe_denominator))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prop = num / den
+        radicand = moe_n ** 2 - prop ** 2 * moe_d ** 2
+        # The Census Bureau falls back to the ratio formula when the radicand is negative
+        radicand = np.where(radicand < 0, moe_n ** 2 + prop ** 2 * moe_d ** 2, radicand)
+        return np.sqrt(radicand) / den
+
+
+def significantly_different(est1, moe1, est2, moe2):
+    """Element-wise test for a significant difference at the 90% level."""
+    diff = np.asarray(est1, dtype=np.float64) - np.asarray(est2, dtype=np.float64)
+    return np.abs(diff) > moe_sum(moe1, moe2)
+
+
+def rank_bounds(estimates, moes, ascending=False, rows=None, chunk=2048):
+    """Best and worst statistically plausible rank (1 = top) of each estimate.
+
+    A row's best rank is one plus the number of rows significantly better
+    than it, its worst rank is ``n`` minus the number significantly worse.
+    Comparisons are done in blocks of ``chunk`` rows against all ``n`` rows,
+    limited to ``rows`` (positions) when given.
+    """
+    est = np.asarray(estimates, dtype=np.float64)
+    if ascending:
+        est = -est
+    moe_sq = np.square(np.asarray(moes, dtype=np.float64))
+    n = len(est)
+    rows = np.arange(n) if rows is None else np.asarray(rows, dtype=np.intp)
+    best = np.empty(len(rows), dtype=np.int64)
+    worst = np.empty(len(rows), dtype=np.int64)
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        diff = est[np.newaxis, :] - est[block, np.newaxis]           # others - self
+        threshold = np.sqrt(moe_sq[np.newaxis, :] + moe_sq[block, np.newaxis])
+        best[start:start + chunk] = 1 + (diff > threshold).sum(axis=1)
+        worst[start:start + chunk] = n - (-diff > threshold).sum(axis=1)
+    return best, worst
+
+
+def significant_top_k(frame, column, moe_column, k=5, ascending=False, missing=None):
+    """Rows that could statistically be in the top ``k`` by ``column``.
+
+    Returns the top ``k`` rows by estimate plus any row statistically tied
+    with them, sorted by estimate, with ``Rank``, ``Rank_Best`` and
+    ``Rank_Worst`` columns and ``In_Top_K`` set where the row is in the top
+    ``k`` even at its worst plausible rank. Rows without a finite estimate
+    and MOE are left out of the ranking, and so are the cells flagged in
+    ``missing``, the mask from ``load_metrics(..., with_missing=True)``:
+    the metrics frame holds suppressed cells as 0, which would otherwise
+    read as an exact estimate.
+    """
+    est = frame[column].to_numpy(dtype=np.float64)
+    moe = frame[moe_column].to_numpy(dtype=np.float64)
+    if missing is not None:
+        flagged = missing.loc[frame.index, [column, moe_column]].to_numpy().any(axis=1)
+        est = np.where(flagged, np.nan, est)
+    # NaN compares false either way, which would make a missing row look tied with everyone
+    valid = np.flatnonzero(np.isfinite(est) & np.isfinite(moe))
+    est, moe = est[valid], moe[valid]
+    key = -est if not ascending else est
+    order = np.argsort(key, kind='stable')
+    top = order[:k]
+
+    # A row is out of contention when every one of the top k is significantly better
+    beaten = (est[top][np.newaxis, :] - est[:, np.newaxis]) * (1 if not ascending else -1) \
+        > np.sqrt(moe[top][np.newaxis, :] ** 2 + moe[:, np.newaxis] ** 2)
+    contenders = np.flatnonzero(beaten.sum(axis=1) < k)
+
+    best, worst = rank_bounds(est, moe, ascending=ascending, rows=contenders)
+    keep = best <= k
+    rows, best, worst = contenders[keep], best[keep], worst[keep]
+    ranks = np.empty(len(est), dtype=np.int64)
+    ranks[order] = np.arange(1, len(est) + 1)
+
+    result = frame.iloc[valid[rows]].assign(Rank=ranks[rows], Rank_Best=best, Rank_Worst=worst,
+                                            In_Top_K=worst <= k)
+    return result.sort_values('Rank', kind='stable')
+
+
+def with_confidence_intervals(frame, columns, level=0.90, suffix='_MOE'):
+    """Copy of ``frame`` with ``<col>_Low``/``<col>_High`` bounds for each column."""
+    bounds = {}
+    for col in columns:
+        low, high = confidence_interval(frame[col], frame[col + suffix], level)
+        bounds[col + '_Low'] = low
+        bounds[col + '_High'] = high
+    return frame.assign(**{name: pd.Series(values, index=frame.index) for name, values in bounds.items()})
@@ -0,0 +1,73 @@
+"""The build graph behind ``all_visuals.py``.
+
+    ingest -> metrics -> top-N selections -> one PNG per visual
+
+Every PNG depends only on its own selection and on its own drawing code, so
+restyling one chart rebuilds just that chart, and a workbook edit that does
+not change which states are selected re-renders nothing.
+"""
+
+import hashlib
+import os
+
+from pcid import bars, cells, extract, layout, metrics, moe
+from pcid.build import BuildGraph, Stage
+from pcid.ingest import DEFAULT_WORKBOOK, cache_dir_for, load_workbook_frame, source_digest
+from pcid.render import CHARTS, FIGSIZE, _draw_image, _new_figure, chart_rows, render_chart, render_image
+from pcid.selection import top_device_ownership, top_income_broadband, top_optic_satellite_gap
+
+# Output file of each visual and the chart that draws it
+VISUALS = {
+    'visual1': ('visual1_income_broadband.png', 'income_broadband'),
+    'visual2': ('visual2_device_ownership.png', 'device_ownership'),
+    'visual3': ('visual3_optic_satellite_gap.png', 'optic_satellite_gap'),
+}
+
+
+SELECTIONS = {
+    'visual1': top_income_broadband,
+    'visual2': top_device_ownership,
+}
+
+
+def select_gap_states(df_metrics, top1, top2, n, **options):
+    # Visual 3 only ranks states that showed up in Visual 1 or Visual 2
+    return top_optic_satellite_gap(df_metrics, [top1, top2], n, **options)
+
+
+def visuals_graph(path=DEFAULT_WORKBOOK, out_dir='.', n=5, figsize=FIGSIZE, rank_by=None):
+    """Return the build graph that produces the three visuals in ``out_dir``.
+
+    ``n`` is the number of states per chart and ``rank_by`` optionally maps a
+    visual ('visual1', ...) to the metrics column its states are ranked by.
+    """
+    rank_by = rank_by or {}
+    out_dir = os.path.abspath(out_dir)
+    stamp_name = 'build-' + hashlib.sha256(out_dir.encode()).hexdigest()[:16] + '.json'
+    graph = BuildGraph(os.path.join(cache_dir_for(path), stamp_name))
+
+    graph.add(Stage('ingest', load_workbook_frame, params={'path': path},
+                    fingerprint=lambda: source_digest(path)))
+    graph.add(Stage('metrics', metrics.build_metrics, inputs={'df': 'ingest'},
+                    code=(metrics, extract, layout, cells, moe)))
+
+    def selection_params(visual):
+        return {'n': n, 'by': rank_by[visual]} if visual in rank_by else {'n': n}
+
+    for visual, select in SELECTIONS.items():
+        graph.add(Stage('top_' + visual, select, inputs={'df_metrics': 'metrics'}, params=selection_params(visual)))
+    graph.add(Stage('top_visual3', select_gap_states,
+                    inputs={'df_metrics': 'metrics', 'top1': 'top_visual1', 'top2': 'top_visual2'},
+                    params=selection_params('visual3'), code=(top_optic_satellite_gap,)))
+
+    chart_cache = os.path.join(cache_dir_for(path), 'charts')
+    for visual, (filename, chart) in VISUALS.items():
+        output = os.path.join(out_dir, filename)
+        # Projecting to the drawn columns lets an edit to any other column skip the render
+        graph.add(Stage('rows_' + visual, chart_rows, inputs={'top': 'top_' + visual}, params={'chart': chart}))
+        params = {'chart': chart, 'path': output, 'figsize': figsize, 'cache_dir': chart_cache}
+        if visual in rank_by:
+            params['ranked_by'] = rank_by[visual]  # For the chart title
+        graph.add(Stage(visual, render_chart, inputs={'top': 'rows_' + visual}, params=params,
+                        output=output, code=(CHARTS[chart], bars, _new_figure, _draw_image, render_image)))
+    return graph
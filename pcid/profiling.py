@@ -0,0 +1,176 @@
+"""Opt-in stage timing, counters and profiler capture.
+
+Instrumentation is off by default and costs one attribute check per stage.
+Turn it on with the ``PCID_PROFILE`` environment variable or a ``--profile``
+flag on the scripts::
+
+    PCID_PROFILE=1 python all_visuals.py
+    python all_visuals.py --profile=cprofile,tracemalloc
+
+The value is a comma-separated list: ``1`` (or ``timers``) times every stage
+and collects counters, ``cprofile`` also records a cProfile of the whole run
+(saved next to the report as ``.prof``), and ``tracemalloc`` adds the peak
+traced memory of each stage. At exit a JSON report is written to
+``$PCID_PROFILE_OUT`` (default ``pcid_profile.json``) and a summary table is
+printed to stderr.
+
+Work done inside worker processes shows up as the wall time of the stage that
+waits on the pool.
+"""
+
+import contextlib
+import os
+import sys
+import time
+
+ENV_VAR = 'PCID_PROFILE'
+OUT_ENV_VAR = 'PCID_PROFILE_OUT'
+DEFAULT_OUT = 'pcid_profile.json'
+
+
+class _Profiler:
+    def __init__(self, options):
+        self.options = options
+        self.started = time.time()
+        self.stages = {}     # path -> {'calls', 'seconds', 'peak_bytes'}
+        self.counters = {}
+        self.stack = []      # [path, peak_bytes] of the open stages
+        self.cprofile = None
+        if 'cprofile' in options:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if 'tracemalloc' in options:
+            import tracemalloc
+            tracemalloc.start()
+            self.tracemalloc = tracemalloc
+        else:
+            self.tracemalloc = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        path = '/'.join([frame[0] for frame in self.stack[-1:]] + [name])
+        tm = self.tracemalloc
+        if tm is not None:
+            if self.stack:
+                self.stack[-1][1] = max(self.stack[-1][1], tm.get_traced_memory()[1])
+            tm.reset_peak()
+        frame = [path, 0]
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stack.pop()
+            entry = self.stages.setdefault(path, {'calls': 0, 'seconds': 0.0, 'peak_bytes': None})
+            entry['calls'] += 1
+            entry['seconds'] += elapsed
+            if tm is not None:
+                frame[1] = max(frame[1], tm.get_traced_memory()[1])
+                entry['peak_bytes'] = max(entry['peak_bytes'] or 0, frame[1])
+                if self.stack:
+                    self.stack[-1][1] = max(self.stack[-1][1], frame[1])
+                tm.reset_peak()
+
+    def count(self, name, n):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def report(self):
+        report = {
+            'options': sorted(self.options),
+            'argv': sys.argv,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_seconds': time.time() - self.started,
+            'stages': self.stages,
+            'counters': self.counters,
+        }
+        if self.cprofile is not None:
+            import io
+            import pstats
+            self.cprofile.disable()
+            out = io.StringIO()
+            pstats.Stats(self.cprofile, stream=out).sort_stats('cumulative').print_stats(25)
+            report['cprofile_top'] = out.getvalue()
+        if self.tracemalloc is not None:
+            report['traced_peak_bytes'] = self.tracemalloc.get_traced_memory()[1]
+        return report
+
+    def write(self, path=None):
+        import json
+        path = path or os.environ.get(OUT_ENV_VAR) or DEFAULT_OUT
+        report = self.report()
+        with open(path, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(os.path.splitext(path)[0] + '.prof')
+        print(summary_table(report), file=sys.stderr)
+        print(f'Profile report written to {path}', file=sys.stderr)
+        return path
+
+
+_profiler = None
+
+
+def enable(options='1'):
+    """Turn instrumentation on for this process and write the report at exit."""
+    global _profiler
+    if _profiler is None:
+        import atexit
+        import multiprocessing
+        opts = {opt.strip().lower() for opt in str(options).split(',') if opt.strip()}
+        _profiler = _Profiler(opts)
+        # Pool workers inherit the environment but must not overwrite the parent's report
+        if multiprocessing.parent_process() is None:
+            atexit.register(_profiler.write)
+    return _profiler
+
+
+def enabled():
+    return _profiler is not None
+
+
+def configure(argv=None):
+    """Enable profiling from ``$PCID_PROFILE`` or a ``--profile[=opts]`` argument.
+
+    Returns ``argv`` with the flag removed.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    options = os.environ.get(ENV_VAR)
+    for arg in list(argv):
+        if arg == '--profile' or arg.startswith('--profile='):
+            options = arg.partition('=')[2] or '1'
+            argv.remove(arg)
+    if options and options != '0':
+        enable(options)
+    return argv
+
+
+def stage(name):
+    """Context manager timing a pipeline stage (a no-op when disabled)."""
+    if _profiler is None:
+        return contextlib.nullcontext()
+    return _profiler.stage(name)
+
+
+def count(name, n=1):
+    """Add ``n`` to a named counter (cells parsed, values coerced, ...)."""
+    if _profiler is not None:
+        _profiler.count(name, n)
+
+
+def summary_table(report):
+    lines = [f'{"stage":<44} {"calls":>6} {"total s":>9} {"mean ms":>9} {"peak MiB":>9}']
+    for path, entry in sorted(report['stages'].items()):
+        peak = entry['peak_bytes']
+        lines.append(f'{path:<44} {entry["calls"]:>6} {entry["seconds"]:>9.3f} '
+                     f'{entry["seconds"] / entry["calls"] * 1000:>9.2f} '
+                     f'{"-" if peak is None else f"{peak / 2**20:.1f}":>9}')
+    for name, value in sorted(report['counters'].items()):
+        lines.append(f'{name:<44} {value:>6,}')
+    return '\n'.join(lines)
+
+
+# Honour the environment variable for scripts that never call configure()
+if os.environ.get(ENV_VAR, '0') != '0':
+    enable(os.environ[ENV_VAR])
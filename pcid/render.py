@@ -0,0 +1,153 @@
+"""Headless chart rendering.
+
+Charts are drawn with matplotlib's object-oriented API on Agg canvases, so no
+pyplot global state or GUI window is involved and the code runs unchanged on
+build machines without a display. Independent charts are rendered
+concurrently in worker processes, and every figure is closed as soon as its
+image is saved. Rendered images can be reused through the content-addressed
+cache in ``pcid.chartcache``.
+"""
+
+import os
+
+from pcid import bars, profiling
+from pcid.bars import draw_grouped
+
+FIGSIZE = (10, 6)
+
+
+def _new_figure(figsize=FIGSIZE):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def draw_income_broadband(fig, top, ranked_by=None):
+    """Visual 1: broadband households per income bracket, in millions."""
+    # Add the percentage to the state labels (rounded back to the sheet's 0.1 precision,
+    # since the float32 column would otherwise print as '96.4000015')
+    labels = [f"{state} ({round(float(pct), 1)}%)" for state, pct in zip(top['State'], top['Income_75k+_BB_Pct'])]
+    draw_grouped(fig, top, ['Income_Under20k_BB', 'Income_20k-75k_BB', 'Income_75k+_BB'],
+                 labels=['Under $20k', '$20k - $74.9k', '$75k or more'],
+                 colors=['#5da5da', '#faa43a', '#60bd68'], width=0.25, scale=1_000_000, tick_labels=labels,
+                 ylabel='Households with Broadband Estimate (in millions)',
+                 title=f'Broadband Usage Across Income Brackets\n'
+                       f'(Top {len(labels)} States ordered by {ranked_by or "Broadband % for $75k+"})',
+                 plain_y=True)
+
+
+def draw_device_ownership(fig, top, ranked_by=None):
+    """Visual 2: smartphone vs desktop/laptop ownership percentages."""
+    draw_grouped(fig, top, ['Smartphone_Pct', 'Desktop_Laptop_Pct'], labels=['Smartphone', 'Desktop/Laptop'],
+                 colors=['#4d4d4d', '#5da5da'], width=0.35,
+                 ylabel='Percentage of Total State Households (%)',
+                 title=f'Device Ownership (Top {len(top)} States ordered by {ranked_by or "Desktop/Laptop %"})',
+                 ylim=(75, 100),  # Zoom in on the top 25% of the chart
+                 legend_loc='upper right')
+
+
+def draw_optic_satellite_gap(fig, top, ranked_by=None):
+    """Visual 3: optic/DSL vs satellite households, in millions."""
+    draw_grouped(fig, top, ['Optic_DSL', 'Satellite'], labels=['Optic/DSL', 'Satellite'],
+                 colors=['#4d4d4d', '#faa43a'], width=0.35, scale=1_000_000,
+                 ylabel='Households (in millions)',
+                 title=f'Optic/DSL vs Satellite Internet Users\n'
+                       f'(Top {len(top)} states from previous charts, ordered by {ranked_by or "highest gap"})',
+                 plain_y=True)
+
+
+CHARTS = {
+    'income_broadband': draw_income_broadband,
+    'device_ownership': draw_device_ownership,
+    'optic_satellite_gap': draw_optic_satellite_gap,
+}
+
+# The metrics columns each chart draws; any other column of a selection can
+# change without the chart changing
+CHART_COLUMNS = {
+    'income_broadband': ['State', 'Income_Under20k_BB', 'Income_20k-75k_BB', 'Income_75k+_BB', 'Income_75k+_BB_Pct'],
+    'device_ownership': ['State', 'Smartphone_Pct', 'Desktop_Laptop_Pct'],
+    'optic_satellite_gap': ['State', 'Optic_DSL', 'Satellite'],
+}
+
+
+def chart_rows(top, chart):
+    """The part of a selection that ``chart`` actually draws."""
+    return top[CHART_COLUMNS[chart]]
+
+
+def _draw_image(chart, top, figsize, fmt, ranked_by=None):
+    import io
+
+    with profiling.stage(f'render:{chart}'):
+        fig = _new_figure(figsize)
+        try:
+            with profiling.stage('draw'):
+                CHARTS[chart](fig, top, ranked_by)
+                fig.tight_layout()
+            with profiling.stage('savefig'):
+                out = io.BytesIO()
+                fig.savefig(out, format=fmt)
+        finally:
+            fig.clear()  # Release the artists; the figure is not tracked by pyplot
+    return out.getvalue()
+
+
+def render_image(chart, top, figsize=FIGSIZE, fmt='png', cache_dir=None, ranked_by=None):
+    """Return the ``fmt`` ('png' or 'svg') image bytes of one chart.
+
+    ``ranked_by`` names the metric the states were selected by, for the
+    title, when it is not the chart's default. With ``cache_dir`` the image is looked up in the content-addressed chart
+    cache first (see ``pcid.chartcache``) and stored there after a render.
+    """
+    if cache_dir is None:
+        return _draw_image(chart, top, figsize, fmt, ranked_by)
+    from pcid.chartcache import ChartCache, chart_key
+
+    cache = ChartCache(cache_dir)
+    key = chart_key(chart, (CHARTS[chart], bars, _new_figure, _draw_image), top, figsize, fmt, ranked_by)
+    data = cache.get(key, fmt)
+    if data is None:
+        data = _draw_image(chart, top, figsize, fmt, ranked_by)
+        cache.put(key, fmt, data)
+    else:
+        profiling.count('chart_cache_hits')
+    return data
+
+
+def render_chart(chart, top, path, figsize=FIGSIZE, cache_dir=None, ranked_by=None):
+    """Draw one chart from its selected rows and write it to ``path``.
+
+    The format follows the file extension. The file is left untouched when it
+    already holds the same image.
+    """
+    fmt = os.path.splitext(path)[1].lstrip('.').lower() or 'png'
+    data = render_image(chart, top, figsize, fmt, cache_dir, ranked_by)
+    try:
+        with open(path, 'rb') as fh:
+            if fh.read() == data:
+                return path
+    except OSError:
+        pass
+    with open(path, 'wb') as fh:
+        fh.write(data)
+    return path
+
+
+def render_charts(jobs, workers=None, cache_dir=None):
+    """Render ``{path: (chart, top)}`` jobs, concurrently when ``workers`` allows.
+
+    Returns the written paths in the order of ``jobs``.
+    """
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        return [render_chart(chart, top, path, cache_dir=cache_dir) for path, (chart, top) in jobs.items()]
+    from concurrent.futures import ProcessPoolExecutor
+    with profiling.stage('render_pool'), ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_chart, chart, top, path, cache_dir=cache_dir)
+                   for path, (chart, top) in jobs.items()]
+        return [future.result() for future in futures]
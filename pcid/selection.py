@@ -0,0 +1,40 @@
+"""Top-N state selections that drive each visual.
+
+Each selection ranks by its visual's default metric, or by any other metrics
+frame column passed as ``by``.
+"""
+
+from pcid.topk import top_k
+
+# Ranking metric -> column that breaks its ties, highest first. Other rankings
+# keep ties in frame order. pcid.store ranks with the same rules.
+TIE_BREAKS = {
+    # Percentages are rounded to 0.1, so ties are common; more households ranks first
+    'Income_75k+_BB_Pct': 'Income_75k+_BB',
+}
+
+
+def _top(frame, by, n):
+    tie_break = TIE_BREAKS.get(by)
+    if tie_break is None:
+        return top_k(frame, by, n)
+    return top_k(frame, by, n, tie_break=tie_break, tie_ascending=False)
+
+
+def top_income_broadband(df_metrics, n=5, by='Income_75k+_BB_Pct'):
+    """Visual 1: states with the highest broadband % among $75k+ households."""
+    return _top(df_metrics, by, n)
+
+
+def top_device_ownership(df_metrics, n=5, by='Desktop_Laptop_Pct'):
+    """Visual 2: states with the highest desktop/laptop ownership %."""
+    return _top(df_metrics, by, n)
+
+
+def top_optic_satellite_gap(df_metrics, prior_selections, n=5, by='Optic_Satellite_Gap'):
+    """Visual 3: among the states already shown, the largest optic/DSL - satellite gap."""
+    combined_states = set()
+    for selection in prior_selections:
+        combined_states.update(selection['State'])
+    candidates = df_metrics[df_metrics['State'].isin(combined_states)]
+    return _top(candidates, by, n)
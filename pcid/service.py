@@ -0,0 +1,308 @@
+"""Long-running JSON query service over the metrics table.
+
+    python -m pcid serve --port 8314
+    curl 'localhost:8314/top?metric=Income_75k%2B_BB_Pct&n=5'
+    curl 'localhost:8314/state/Utah?metrics=Smartphone_Pct,Satellite_Pct'
+    curl 'localhost:8314/gap?states=Utah,Maryland,Colorado'
+    curl 'localhost:8314/chart/visual1?n=8&format=svg' > visual1.svg
+
+The workbook is parsed once per dataset version (its SHA-256, see
+``pcid.ingest.source_digest``), and answers are kept in an LRU cache keyed by
+that version, so repeated questions cost a dictionary lookup and an edited
+workbook is picked up on the next request. Plain asyncio and a minimal
+HTTP/1.1 reader keep it dependency-free; it is meant for localhost use.
+Answers are computed off the event loop, in a worker thread, so a workbook
+reload or a slow query never holds up the other connections.
+Chart images come from the content-addressed chart cache (``pcid.chartcache``),
+so each parameter variant is rendered at most once, and a cache miss is
+rendered in a separate process so matplotlib never holds up the server.
+"""
+
+import asyncio
+import collections
+import functools
+import json
+import os
+import threading
+import urllib.parse
+
+import numpy as np
+
+from pcid.ingest import DEFAULT_WORKBOOK, cache_dir_for, source_digest
+from pcid.metrics import load_metrics
+from pcid.selection import TIE_BREAKS, top_optic_satellite_gap
+from pcid.topk import top_k
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8314
+
+
+class QueryError(ValueError):
+    """A bad request: unknown metric, state or parameter."""
+
+
+class UnknownEndpoint(QueryError):
+    pass
+
+
+class _LRU(collections.OrderedDict):
+
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def put(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def _json_value(value):
+    if isinstance(value, np.floating):
+        # Shortest repr of the float32 value, so 96.4 is not sent as 96.4000015
+        return None if np.isnan(value) else float(str(value))
+    if isinstance(value, np.integer):
+        return int(value)
+    return value if isinstance(value, (int, float, str)) else str(value)
+
+
+def _records(frame, columns):
+    arrays = [frame[col].to_numpy() for col in columns]
+    return [{col: _json_value(arr[i]) for col, arr in zip(columns, arrays)} for i in range(len(frame))]
+
+
+def _metric_names(df_metrics, names):
+    names = [name for name in names.split(',') if name] if isinstance(names, str) else list(names)
+    unknown = [name for name in names if name not in df_metrics.columns or name == 'State']
+    if unknown:
+        raise QueryError(f'unknown metric(s): {", ".join(unknown)}')
+    return names
+
+
+def _state_names(df_metrics, names):
+    names = [name.strip() for name in names.split(',') if name.strip()]
+    unknown = sorted(set(names) - set(df_metrics['State'].astype(str)))
+    if unknown:
+        raise QueryError(f'unknown state(s): {", ".join(unknown)}')
+    return names
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise QueryError(f'{name} must be an integer') from None
+
+
+def query_top(df_metrics, metric, n=5, ascending=False):
+    """Top ``n`` states by ``metric``, ties broken as the visuals and ``store top`` do (see ``TIE_BREAKS``)."""
+    (metric,) = _metric_names(df_metrics, [metric])
+    tie_break = TIE_BREAKS.get(metric)
+    if tie_break is None:
+        top = top_k(df_metrics, metric, n, ascending=ascending)
+    else:
+        top = top_k(df_metrics, metric, n, ascending=ascending, tie_break=tie_break, tie_ascending=False)
+    return _records(top, ['State', metric])
+
+
+def query_state(df_metrics, state, metrics=None):
+    """Every metric (or the ``metrics`` subset) for one state."""
+    (state,) = _state_names(df_metrics, state)
+    columns = ['State'] + (_metric_names(df_metrics, metrics) if metrics else list(df_metrics.columns[1:]))
+    return _records(df_metrics[df_metrics['State'] == state], columns)[0]
+
+
+def query_gap(df_metrics, states, metric='Optic_Satellite_Gap', n=None):
+    """Rank ``states`` by the optic/DSL - satellite gap (or another ``metric``)."""
+    states = _state_names(df_metrics, states)
+    (metric,) = _metric_names(df_metrics, [metric])
+    ranked = top_optic_satellite_gap(df_metrics, [{'State': states}], n or len(states), by=metric)
+    return _records(ranked, ['State', metric])
+
+
+class MetricsService:
+    """Answer metric queries for one workbook, caching by dataset version.
+
+    Safe to call from several threads at once.
+    """
+
+    def __init__(self, path=DEFAULT_WORKBOOK, max_versions=2, max_queries=1024):
+        self.path = path
+        self._frames = _LRU(max_versions)
+        self._answers = _LRU(max_queries)
+        self._lock = threading.Lock()  # Guards the caches and counters
+        self._load_lock = threading.Lock()  # One workbook parse at a time
+        self.hits = self.misses = 0
+
+    def version(self):
+        # Served from the stat index, so this is a stat() call unless the file changed
+        return source_digest(self.path)
+
+    def frame(self, version=None):
+        version = version or self.version()
+        with self._lock:
+            df_metrics = self._frames.get(version)
+        if df_metrics is None:
+            with self._load_lock:  # A concurrent request may have loaded it meanwhile
+                with self._lock:
+                    df_metrics = self._frames.get(version)
+                if df_metrics is None:
+                    df_metrics = load_metrics(self.path)
+                    with self._lock:
+                        self._frames.put(version, df_metrics)
+        return df_metrics
+
+    def query(self, route, params):
+        """Return the JSON-ready answer for ``route`` (``top``, ``state/<name>``, ``gap``, ...)."""
+        version = self.version()
+        key = (version, route, tuple(sorted(params.items())))
+        with self._lock:
+            answer = self._answers.get(key)
+            if answer is not None:
+                self.hits += 1
+                return answer
+            self.misses += 1
+        answer = {'version': version[:12], 'result': self._answer(route, params, self.frame(version))}
+        with self._lock:
+            self._answers.put(key, answer)
+        return answer
+
+    def _answer(self, route, params, df_metrics):
+        if route == 'metrics':
+            return list(df_metrics.columns[1:])
+        if route == 'states':
+            return list(df_metrics['State'].astype(str))
+        if route == 'top':
+            if 'metric' not in params:
+                raise QueryError('top needs ?metric=')
+            return query_top(df_metrics, params['metric'], _int_param(params, 'n', 5),
+                             params.get('order', 'desc') == 'asc')
+        if route.startswith('state/'):
+            return query_state(df_metrics, route.removeprefix('state/'), params.get('metrics'))
+        if route == 'gap':
+            if 'states' not in params:
+                raise QueryError('gap needs ?states=')
+            return query_gap(df_metrics, params['states'], params.get('metric', 'Optic_Satellite_Gap'),
+                             _int_param(params, 'n', 0))
+        raise UnknownEndpoint(f'unknown endpoint /{route}')
+
+    def chart(self, visual, params):
+        """Return ``(content_type, image bytes)`` of a visual for the given parameters."""
+        from pcid.render import render_image
+
+        content_type, job = self.chart_job(visual, params)
+        return content_type, render_image(**job)
+
+    def chart_job(self, visual, params):
+        """Select a visual's rows; returns ``(content_type, render_image keyword arguments)``."""
+        from pcid.chartcache import FORMATS
+        from pcid.pipeline import SELECTIONS, VISUALS, select_gap_states
+        from pcid.render import chart_rows
+
+        if visual not in VISUALS:
+            raise UnknownEndpoint(f'unknown chart {visual!r}, expected one of {", ".join(VISUALS)}')
+        fmt = params.get('format', 'png')
+        if fmt not in FORMATS:
+            raise QueryError(f'format must be one of {", ".join(FORMATS)}')
+        df_metrics = self.frame()
+        n = _int_param(params, 'n', 5)
+        options = {'by': _metric_names(df_metrics, [params['metric']])[0]} if 'metric' in params else {}
+        if visual in SELECTIONS:
+            top = SELECTIONS[visual](df_metrics, n, **options)
+        else:
+            top1, top2 = (select(df_metrics, n) for select in SELECTIONS.values())
+            top = select_gap_states(df_metrics, top1, top2, n, **options)
+        chart = VISUALS[visual][1]
+        # Only the drawn columns: less to send to the render process, and the same cache key as the pipeline's
+        job = {'chart': chart, 'top': chart_rows(top, chart), 'fmt': fmt, 'ranked_by': options.get('by'),
+               'cache_dir': os.path.join(cache_dir_for(self.path), 'charts')}
+        return ('image/svg+xml' if fmt == 'svg' else 'image/png'), job
+
+
+async def _read_request(reader):
+    request_line = (await reader.readline()).decode('latin-1').split()
+    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+        pass  # Headers are not needed: GET only, no body, one request per connection
+    if len(request_line) < 2:
+        return None, None
+    return request_line[0], request_line[1]
+
+
+async def _write_response(writer, status, body, content_type='application/json'):
+    reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+    writer.write(f'HTTP/1.1 {status} {reasons[status]}\r\n'
+                 f'Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n'
+                 'Connection: close\r\n\r\n'.encode() + payload)
+    await writer.drain()
+
+
+async def handle(service, reader, writer, render_pool=None):
+    """Answer one HTTP request; charts are rendered in ``render_pool`` (default: a thread)."""
+    from pcid.render import render_image
+
+    loop = asyncio.get_running_loop()
+    try:
+        method, target = await _read_request(reader)
+        content_type = 'application/json'
+        if method != 'GET':
+            status, body = 405, {'error': 'only GET is supported'}
+        else:
+            url = urllib.parse.urlsplit(target)
+            route = urllib.parse.unquote(url.path).strip('/')
+            params = dict(urllib.parse.parse_qsl(url.query))
+            try:
+                if route.startswith('chart/'):
+                    content_type, job = await loop.run_in_executor(None, service.chart_job,
+                                                                   route.removeprefix('chart/'), params)
+                    # The chart cache is checked in the worker too, so a hit costs a file read there
+                    body = await loop.run_in_executor(render_pool, functools.partial(render_image, **job))
+                else:
+                    body = await loop.run_in_executor(None, service.query, route, params)
+                status = 200
+            except QueryError as exc:
+                status, body = 404 if isinstance(exc, UnknownEndpoint) else 400, {'error': str(exc)}
+        await _write_response(writer, status, body, content_type if status == 200 else 'application/json')
+    except Exception as exc:  # Keep serving after a bug in one request
+        await _write_response(writer, 500, {'error': repr(exc)})
+    finally:
+        writer.close()
+
+
+async def start_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, render_pool=None):
+    """Start answering HTTP requests for ``service``; returns the ``asyncio.Server``."""
+    return await asyncio.start_server(lambda r, w: handle(service, r, w, render_pool), host, port)
+
+
+def _ignore_interrupt():
+    import signal
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C stops the server, which then shuts the pool down
+
+
+def render_pool(workers=2):
+    """Process pool for chart renders (spawned, since the server runs worker threads)."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_ignore_interrupt)
+
+
+async def serve(path=DEFAULT_WORKBOOK, host=DEFAULT_HOST, port=DEFAULT_PORT, render_workers=2):
+    """Load the metrics once, then answer queries until cancelled."""
+    service = MetricsService(path)
+    service.frame()  # Pay the parse cost before the first request
+    with render_pool(render_workers) as pool:
+        server = await start_server(service, host, port, pool)
+        address = server.sockets[0].getsockname()
+        print(f'Serving metrics for {path} on http://{address[0]}:{address[1]}/', flush=True)
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,155 @@
+"""Publish the metrics frame once in shared memory for rendering workers.
+
+``publish`` packs every column of a metrics frame (numeric columns as they
+are, categoricals such as ``State`` as their integer codes) into a single
+``multiprocessing.shared_memory`` block and returns a small, picklable
+handle. ``attach`` turns the handle back into a DataFrame whose columns are
+read-only NumPy views of that block, so a worker process maps the data
+instead of receiving a pickled copy or re-parsing the workbook::
+
+    with published(df_metrics) as handle:
+        render_many(handle, {'utah.png': ('device_ownership', [44]), ...}, workers=16)
+
+Each pool worker attaches once, in its initializer, and every job then ships
+only a chart name, a few row positions and an output path. ``render_many`` is
+a library entry point for scripts that draw per-geography charts in bulk; the
+CLI's three visuals each draw one top-N selection of a few rows, which is
+cheaper to pickle than to map.
+
+NumPy views of a ``SharedMemory`` buffer do not pin it, so closing the block
+under them would unmap memory they still read. Every ``attach`` therefore maps
+the block on its own and closes that mapping only once the last view of it is
+garbage collected; the publisher's ``close()`` and ``unlink()`` never pull the
+memory from under an attached frame.
+"""
+
+import contextlib
+import os
+import sys
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+_ALIGN = 64
+_mapped = weakref.WeakValueDictionary()  # Block name -> this process's live mapping of it
+
+
+def publish(df_metrics):
+    """Copy ``df_metrics`` into a new shared memory block; returns ``(shm, handle)``.
+
+    The caller owns ``shm`` and must ``close()`` and ``unlink()`` it (see
+    ``published``). ``handle`` is what workers pass to ``attach``.
+    """
+    columns, arrays, offset = [], [], 0
+    for name in df_metrics.columns:
+        column = df_metrics[name]
+        categories = None
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            categories = column.cat.categories.tolist()
+            values = column.cat.codes.to_numpy()
+        else:
+            values = column.to_numpy()
+        if values.dtype == object:
+            raise TypeError(f'Column {name!r} is not numeric or categorical and cannot be shared')
+        columns.append({'name': name, 'dtype': values.dtype.str, 'offset': offset, 'categories': categories})
+        arrays.append(values)
+        offset += -(-values.nbytes // _ALIGN) * _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for spec, values in zip(columns, arrays):
+        view = np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf, offset=spec['offset'])
+        view[:] = values
+    handle = {'shm': shm.name, 'rows': len(df_metrics), 'columns': columns}
+    return shm, handle
+
+
+@contextlib.contextmanager
+def published(df_metrics):
+    """``publish`` for the duration of a ``with`` block, then free the block."""
+    shm, handle = publish(df_metrics)
+    try:
+        yield handle
+    finally:
+        shm.close()  # Only the publisher's own mapping; attached frames keep theirs
+        shm.unlink()
+
+
+def _open(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Pool workers share the publishing process's resource tracker, so the
+    # extra registration is harmless and the publisher's unlink() clears it
+    return shared_memory.SharedMemory(name=name)
+
+
+def _map(name):
+    # One read-only byte array over the block; every column is a view of it,
+    # so the mapping is closed when the last column (of any frame) is freed
+    block = _mapped.get(name)
+    if block is None:
+        shm = _open(name)
+        block = np.ndarray((shm.size,), dtype=np.uint8, buffer=shm.buf)
+        block.flags.writeable = False
+        weakref.finalize(block, shm.close).atexit = False  # At exit the mapping goes with the process
+        _mapped[name] = block
+    return block
+
+
+def attach(handle):
+    """The published frame as read-only views of the shared block (no copy).
+
+    Categorical columns are views too: their codes are the shared array and
+    only the (few) category labels come from the handle.
+    """
+    block = _map(handle['shm'])
+    rows = handle['rows']
+    data = {}
+    for spec in handle['columns']:
+        dtype = np.dtype(spec['dtype'])
+        values = block[spec['offset']:spec['offset'] + rows * dtype.itemsize].view(dtype)
+        if spec['categories'] is not None:
+            values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(spec['categories']))
+        data[spec['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+_worker_frame = None
+
+
+def _init_worker(handle):
+    global _worker_frame
+    _worker_frame = attach(handle)
+
+
+def _render(frame, chart, positions, path, figsize, cache_dir):
+    from pcid.render import chart_rows, render_chart
+
+    return render_chart(chart, chart_rows(frame.iloc[positions], chart), path, figsize, cache_dir)
+
+
+def _render_job(chart, positions, path, figsize, cache_dir):
+    return _render(_worker_frame, chart, positions, path, figsize, cache_dir)
+
+
+def render_many(handle, jobs, workers=None, figsize=None, cache_dir=None):
+    """Render ``{path: (chart, row positions)}`` jobs from a published metrics frame.
+
+    Workers attach to the shared block once at startup; each job sends only
+    its chart name, row positions and path. Returns the paths in job order.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from pcid.render import FIGSIZE
+
+    figsize = figsize or FIGSIZE
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1:
+        frame = attach(handle)
+        return [_render(frame, chart, list(positions), path, figsize, cache_dir)
+                for path, (chart, positions) in jobs.items()]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(handle,)) as pool:
+        futures = [pool.submit(_render_job, chart, list(positions), path, figsize, cache_dir)
+                   for path, (chart, positions) in jobs.items()]
+        return [future.result() for future in futures]
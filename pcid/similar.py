@@ -0,0 +1,149 @@
+"""Peer groups of geographies by their device and subscription profile.
+
+Each geography becomes one vector of every percentage in the table's device
+("TYPES OF COMPUTER") and subscription ("TYPE OF INTERNET SUBSCRIPTIONS")
+sections, z-scored per feature so that no single row dominates the distance.
+Neighbours are found with vectorized Euclidean distances computed in chunks
+and ``np.argpartition`` (no Python loop over geographies), or with a
+``scipy.spatial.cKDTree`` when scipy is installed and the table is large
+enough for a tree to pay off, e.g. tracts or counties. ``kmeans`` groups
+geographies into clusters of similar profiles.
+"""
+
+import numpy as np
+
+from pcid.layout import SEPARATOR
+
+PROFILE_SECTIONS = ('TYPES OF COMPUTER', 'TYPE OF INTERNET SUBSCRIPTIONS')
+# Below this many geographies brute force beats building a tree
+KDTREE_MIN_ROWS = 5000
+
+
+def profile_features(cube, sections=PROFILE_SECTIONS, role='Percent'):
+    """Return ``(feature labels, z-scored matrix)`` with one row per geography of ``cube``.
+
+    Rows with a missing value in a geography get the feature's mean (0 after
+    scaling), and features that are constant or entirely missing are dropped.
+    """
+    rows = {}
+    for key, row in cube.layout.rows.items():
+        section, sep, label = key.partition(SEPARATOR)
+        if sep and section in sections and row not in rows.values():
+            rows[label] = row
+    labels = sorted(rows, key=rows.get)
+    # By sheet row, since short labels such as 'Without an Internet subscription' repeat in the table
+    matrix = np.column_stack([cube.get(rows[label], role) for label in labels])
+
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0)
+    keep = np.isfinite(std) & (std > 0)
+    scaled = (matrix[:, keep] - mean[keep]) / std[keep]
+    scaled[np.isnan(scaled)] = 0.0
+    return [label for label, kept in zip(labels, keep) if kept], scaled
+
+
+def _squared_distances(queries, points, point_norms=None):
+    # |q - p|^2 = |q|^2 + |p|^2 - 2 q.p, as one matrix product per chunk
+    if point_norms is None:
+        point_norms = np.einsum('ij,ij->i', points, points)
+    d2 = np.einsum('ij,ij->i', queries, queries)[:, np.newaxis] + point_norms[np.newaxis, :] - 2 * queries @ points.T
+    return np.maximum(d2, 0.0)
+
+
+def pairwise_distances(points, chunk=2048):
+    """Full Euclidean distance matrix (n x n); use ``nearest`` when n is large."""
+    norms = np.einsum('ij,ij->i', points, points)
+    out = np.empty((len(points), len(points)))
+    for start in range(0, len(points), chunk):
+        out[start:start + chunk] = np.sqrt(_squared_distances(points[start:start + chunk], points, norms))
+    return out
+
+
+def nearest(points, k=5, queries=None, chunk=2048, use_tree=None):
+    """The ``k`` nearest rows of ``points`` to each query row, excluding the query itself.
+
+    ``queries`` is an array of row positions (default: every row). Returns
+    ``(indices, distances)``, each of shape (len(queries), k), closest first.
+    """
+    n = len(points)
+    queries = np.arange(n) if queries is None else np.atleast_1d(np.asarray(queries, dtype=np.intp))
+    k = min(k, n - 1)
+    if use_tree is None:
+        use_tree = n >= KDTREE_MIN_ROWS
+    if use_tree:
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            pass
+        else:
+            distances, indices = cKDTree(points).query(points[queries], k=k + 1)
+            return _drop_self(queries, indices.reshape(len(queries), -1), distances.reshape(len(queries), -1), k)
+
+    norms = np.einsum('ij,ij->i', points, points)
+    indices = np.empty((len(queries), k + 1), dtype=np.intp)
+    distances = np.empty((len(queries), k + 1))
+    for start in range(0, len(queries), chunk):
+        d2 = _squared_distances(points[queries[start:start + chunk]], points, norms)
+        part = np.argpartition(d2, k, axis=1)[:, :k + 1] if k + 1 < n else np.broadcast_to(np.arange(n), d2.shape)
+        part_d2 = np.take_along_axis(d2, part, axis=1)
+        order = np.argsort(part_d2, axis=1, kind='stable')
+        indices[start:start + chunk] = np.take_along_axis(part, order, axis=1)
+        distances[start:start + chunk] = np.sqrt(np.take_along_axis(part_d2, order, axis=1))
+    return _drop_self(queries, indices, distances, k)
+
+
+def _drop_self(queries, indices, distances, k):
+    # The query is normally its own first hit; drop it (or the last hit when a duplicate got first place)
+    is_self = indices == queries[:, np.newaxis]
+    drop = np.where(is_self.any(axis=1), is_self.argmax(axis=1), k)
+    keep = np.arange(k + 1)[np.newaxis, :] != drop[:, np.newaxis]
+    return indices[keep].reshape(len(queries), k), distances[keep].reshape(len(queries), k)
+
+
+def kmeans(points, clusters, iterations=100, seed=0, chunk=4096):
+    """Lloyd's k-means with k-means++ seeding; returns ``(labels, centers)``."""
+    rng = np.random.default_rng(seed)
+    n = len(points)
+    clusters = min(clusters, n)
+    centers = [points[rng.integers(n)]]
+    closest = _squared_distances(points, centers[0][np.newaxis, :])[:, 0]
+    for _ in range(1, clusters):
+        total = closest.sum()
+        pick = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centers.append(points[pick])
+        closest = np.minimum(closest, _squared_distances(points, points[pick][np.newaxis, :])[:, 0])
+    centers = np.array(centers)
+
+    labels = np.full(n, -1)
+    for _ in range(iterations):
+        new_labels = np.concatenate([_squared_distances(points[start:start + chunk], centers).argmin(axis=1)
+                                     for start in range(0, n, chunk)])
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        occupied = counts > 0  # An emptied cluster keeps its old center
+        centers[occupied] = sums[occupied] / counts[occupied, np.newaxis]
+    return labels, centers
+
+
+def similar_geographies(cube, geography, k=5, sections=PROFILE_SECTIONS):
+    """The ``k`` geographies whose profile is closest to ``geography``'s, as ``[(name, distance), ...]``."""
+    if geography not in cube.geographies:
+        raise KeyError(geography)
+    _, features = profile_features(cube, sections)
+    indices, distances = nearest(features, k, queries=[cube.geographies.index(geography)])
+    return [(cube.geographies[i], float(d)) for i, d in zip(indices[0], distances[0])]
+
+
+def peer_groups(cube, clusters=6, sections=PROFILE_SECTIONS, seed=0):
+    """Cluster geographies by profile; returns ``{cluster: [names]}`` ordered by cluster size."""
+    _, features = profile_features(cube, sections)
+    labels, _ = kmeans(features, clusters, seed=seed)
+    groups = {}
+    for name, label in zip(cube.geographies, labels.tolist()):
+        groups.setdefault(label, []).append(name)
+    return dict(enumerate(sorted(groups.values(), key=len, reverse=True)))
@@ -0,0 +1,170 @@
+"""Embedded SQLite store of the tidy metrics, for repeated filtered queries.
+
+Every loaded workbook adds its long table (see ``pcid.export``) to one local
+database, so later questions are indexed ``WHERE ... ORDER BY ... LIMIT``
+queries instead of a workbook reload and a full in-memory scan::
+
+    python -m pcid store load data/*.xlsx
+    python -m pcid store top Income_75k+_BB_Pct --n 5
+    python -m pcid store top Optic_Satellite_Gap --states Utah,Maryland,Colorado
+
+Metrics are addressed by their wide-frame names: ``Smartphone_Pct`` is the
+``percent`` field of metric ``Smartphone``, ``Smartphone_MOE`` its ``moe``.
+A workbook whose SHA-256 is already recorded is not loaded twice, and one
+whose year cannot be determined is stored under year ``UNKNOWN_YEAR``.
+Suppressed cells are stored as NULL and never ranked.
+SQLite ships with Python, so the store needs no extra dependency or service.
+"""
+
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from pcid.ingest import DEFAULT_WORKBOOK, cache_dir_for, source_digest
+
+STORE_NAME = 'metrics.sqlite'
+# Bumped whenever SCHEMA changes; an older store is rebuilt (it is reloadable from the workbooks)
+SCHEMA_VERSION = 2
+# Year of workbooks whose year is unknown; part of the primary key, which must not be NULL
+UNKNOWN_YEAR = 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    year INTEGER NOT NULL,
+    geo_level TEXT NOT NULL,
+    geography TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    estimate REAL,
+    moe REAL,
+    percent REAL,
+    percent_moe REAL,
+    PRIMARY KEY (metric, year, geo_level, geography)
+);
+CREATE INDEX IF NOT EXISTS metrics_geography ON metrics (geography, year, metric);
+CREATE INDEX IF NOT EXISTS metrics_year ON metrics (year, geo_level);
+CREATE TABLE IF NOT EXISTS sources (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    geo_level TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL
+);
+"""
+
+FIELDS = ('estimate', 'moe', 'percent', 'percent_moe')
+# Wide-frame suffix -> store field, longest suffix first
+_SUFFIXES = (('_Pct_MOE', 'percent_moe'), ('_Pct', 'percent'), ('_MOE', 'moe'))
+
+
+def default_path():
+    return os.environ.get('PCID_STORE') or os.path.join(cache_dir_for(DEFAULT_WORKBOOK), STORE_NAME)
+
+
+def connect(path=None):
+    """Open (creating if needed) the store at ``path``."""
+    conn = sqlite3.connect(path or default_path())
+    if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        with conn:
+            conn.executescript('DROP TABLE IF EXISTS metrics; DROP TABLE IF EXISTS sources;')
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def split_metric(name):
+    """``'Smartphone_Pct'`` -> ``('Smartphone', 'percent')``."""
+    for suffix, field in _SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)], field
+    return name, 'estimate'
+
+
+def _rows(tidy):
+    from pcid.export import shortest_float
+
+    columns = [tidy['year'].fillna(UNKNOWN_YEAR).astype(int).tolist()]
+    columns += [tidy[col].astype(str).tolist() for col in ('geo_level', 'geography', 'metric')]
+    for field in FIELDS:
+        values = tidy[field].to_numpy()
+        values = shortest_float(values) if values.dtype == np.float32 else values.astype(np.float64)
+        columns.append([None if np.isnan(v) else v for v in values.tolist()])
+    return zip(*columns)
+
+
+def load_workbook(conn, path, year=None, geo_level=None):
+    """Add one workbook's metrics; returns the rows written (0 if already loaded).
+
+    Rows of the same year and geography level are replaced, so reloading an
+    edited workbook updates the store in place.
+    """
+    from pcid.batch import geography_level, workbook_year
+    from pcid.export import tidy_metrics
+    from pcid.metrics import load_metrics
+
+    sha = source_digest(path)
+    if conn.execute('SELECT 1 FROM sources WHERE sha256 = ?', (sha,)).fetchone():
+        return 0
+    if year is None:
+        year = workbook_year(path)
+    if year is None:
+        year = UNKNOWN_YEAR
+    geo_level = geo_level or geography_level(path)
+    df_metrics, missing = load_metrics(path, with_missing=True)
+    tidy = tidy_metrics(df_metrics, year, geo_level, missing)
+    with conn:
+        conn.execute('DELETE FROM metrics WHERE year = ? AND geo_level = ?', (year, geo_level))
+        conn.execute('DELETE FROM sources WHERE year = ? AND geo_level = ?', (year, geo_level))
+        conn.executemany('INSERT INTO metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)', _rows(tidy))
+        conn.execute('INSERT INTO sources VALUES (?, ?, ?, ?, ?, ?)',
+                     (sha, os.path.abspath(path), year, geo_level, len(tidy), time.strftime('%Y-%m-%dT%H:%M:%S')))
+    return len(tidy)
+
+
+def latest_year(conn, geo_level='state'):
+    return conn.execute('SELECT MAX(year) FROM metrics WHERE geo_level = ?', (geo_level,)).fetchone()[0]
+
+
+def top_n(conn, metric, n=5, year=None, geo_level='state', geographies=None, ascending=False):
+    """The ``n`` best geographies by ``metric`` (a wide-frame name), as ``[(geography, value), ...]``.
+
+    ``year`` defaults to the latest year in the store, and ``geographies``
+    restricts the ranking to a set of names (Visual 3's filter). Ties are
+    broken as in ``pcid.selection``: by the metric's ``TIE_BREAKS`` column,
+    highest first, then by name, which is the sheet's order of the states.
+    """
+    from pcid.selection import TIE_BREAKS
+
+    base, field = split_metric(metric)
+    if year is None:
+        year = latest_year(conn, geo_level)
+    order = 'ASC' if ascending else 'DESC'
+    order_by = f'{field} {order}'
+    if metric in TIE_BREAKS:
+        tie_base, tie_field = split_metric(TIE_BREAKS[metric])
+        if tie_base != base:
+            raise ValueError(f'Tie-break {TIE_BREAKS[metric]!r} of {metric!r} is not stored alongside it')
+        order_by += f', {tie_field} DESC'
+    sql = (f'SELECT geography, {field} FROM metrics WHERE metric = ? AND year = ? AND geo_level = ?'
+           f' AND {field} IS NOT NULL')
+    params = [base, year, geo_level]
+    if geographies is not None:
+        geographies = list(geographies)
+        sql += f' AND geography IN ({", ".join("?" * len(geographies))})'
+        params += geographies
+    sql += f' ORDER BY {order_by}, geography LIMIT ?'
+    rows = conn.execute(sql, params + [n]).fetchall()
+    if not rows and not conn.execute('SELECT 1 FROM metrics WHERE metric = ? LIMIT 1', (base,)).fetchone():
+        raise KeyError(metric)
+    return rows
+
+
+def geography_metrics(conn, geography, year=None, geo_level='state'):
+    """Every metric of one geography as ``{metric: {field: value}}``."""
+    if year is None:
+        year = latest_year(conn, geo_level)
+    rows = conn.execute(f'SELECT metric, {", ".join(FIELDS)} FROM metrics'
+                        ' WHERE geography = ? AND year = ? AND geo_level = ?', (geography, year, geo_level))
+    return {metric: dict(zip(FIELDS, values)) for metric, *values in rows}
@@ -0,0 +1,102 @@
+"""Streaming ingest for workbooks too large to load whole.
+
+``pd.read_excel`` materialises the entire sheet, while the visuals only need a
+handful of rows. ``stream_metrics`` walks the sheet with openpyxl's read-only
+row iterator instead and keeps just the header rows and the rows whose labels
+the requested metrics refer to.
+
+A plain label such as ``'With a broadband Internet subscription'`` may repeat
+further down the sheet, so by default every row is read (only the wanted ones
+are kept) and labels are resolved exactly as ``TableLayout`` resolves them on
+a loaded sheet, raising ``KeyError`` for an ambiguous one. When every
+requested label is qualified with its group or section (see ``pcid.layout``),
+reading stops as soon as every metric has been located.
+"""
+
+import numpy as np
+
+from pcid import profiling
+from pcid.extract import NON_STATE_COLUMNS, frame_from_cells, metric_dtype
+from pcid.layout import SEPARATOR, TableLayout
+
+
+def _label(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _column_names(header):
+    # Same naming as pd.read_excel, including 'Unnamed: n' for blank header cells
+    return [str(value) if value is not None else f'Unnamed: {i}' for i, value in enumerate(header)]
+
+
+def iter_sheet_rows(path):
+    """Yield the first sheet's rows as tuples of values, without loading the workbook."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def stream_metrics(path, metrics, derived=None, exclude=NON_STATE_COLUMNS, with_missing=False):
+    """Build the metrics frame for ``{name: (row_label, column_role)}`` by streaming.
+
+    Returns the same result as ``extract_metrics`` on the fully loaded sheet,
+    and raises the same ``KeyError`` for a missing or ambiguous label.
+    """
+    with profiling.stage('stream'):
+        return _stream_metrics(path, metrics, derived, exclude, with_missing)
+
+
+def _stream_metrics(path, metrics, derived, exclude, with_missing):
+    # Only rows whose own label is the last part of a requested label are kept
+    wanted = {spec[0].split(SEPARATOR)[-1] for spec in metrics.values()}
+    dtypes = [metric_dtype(spec) for spec in metrics.values()]
+    # Resolving against the rows read so far is final only if no label can repeat further down
+    stop_early = all(SEPARATOR in spec[0] for spec in metrics.values())
+
+    rows = iter_sheet_rows(path)
+    columns = _column_names(next(rows))
+    labels, empty_rows, kept = [], [], {}
+    role_row = None
+    resolved = None
+
+    def layout():
+        return TableLayout(columns, labels, kept[role_row - 1], kept[role_row], role_row + 1, empty_rows)
+
+    for i, values in enumerate(rows):
+        label = _label(values[0])
+        labels.append(values[0])
+        if all(value is None for value in values[1:]):
+            empty_rows.append(i)
+        if role_row is None:
+            kept[i] = values  # Header rows, needed for the column roles
+            if label == 'Label':
+                role_row = i
+            continue
+        if label.rstrip(':') not in wanted:
+            continue
+        kept[i] = values
+        if stop_early:
+            try:
+                resolved = layout().resolve(metrics)
+            except KeyError:
+                continue
+            break  # Every metric is located, the rest of the sheet is never read
+    rows.close()
+    profiling.count('rows_streamed', len(labels) + 1)
+
+    if role_row is None:
+        raise KeyError(f"No 'Label' header row found in {path}")
+    final = layout()
+    if resolved is None:
+        resolved = final.resolve(metrics)  # Raises for the first missing or ambiguous label
+
+    names, positions = final.geography_positions(exclude)
+    cells = np.empty((len(names), len(resolved)), dtype=object)
+    for j, (row, offset) in enumerate(resolved.values()):
+        row_values = kept[row]
+        cells[:, j] = [row_values[pos + offset] if pos + offset < len(row_values) else None for pos in positions]
+    return frame_from_cells(names, cells, list(metrics), dtypes, derived, with_missing)
@@ -0,0 +1,113 @@
+"""Top-K selection by partial selection instead of full sorts.
+
+``np.argpartition`` finds the K best rows in O(n); only those K rows (plus any
+rows tied with the K-th value) are then sorted. Missing values always rank
+last, as with ``sort_values``.
+
+Ties are broken by ``tie_break``: ``'first'`` keeps the row that comes first
+in the frame, ``'last'`` the one that comes last, and a column name (or list
+of column names) ranks tied rows by those columns, in ascending order unless
+``tie_ascending`` is false. Rows still tied after that keep frame order.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _rank_keys(values, ascending):
+    # Smaller key = better rank; NaN maps to +inf so it is never preferred
+    keys = np.asarray(values, dtype=np.float64)
+    if not ascending:
+        keys = -keys
+    return np.where(np.isnan(keys), np.inf, keys)
+
+
+def _column_key(values, ascending):
+    if not np.issubdtype(values.dtype, np.number):
+        values = pd.factorize(values, sort=True)[0]
+    return values if ascending else -values
+
+
+def _tie_keys(frame, positions, tie_break, tie_ascending=True):
+    if tie_break == 'first':
+        return [positions]
+    if tie_break == 'last':
+        return [-positions]
+    columns = [tie_break] if isinstance(tie_break, str) else list(tie_break)
+    ascending = [tie_ascending] * len(columns) if isinstance(tie_ascending, bool) else list(tie_ascending)
+    # Least significant key first, as np.lexsort expects
+    return [positions] + [_column_key(frame[col].to_numpy()[positions], asc)
+                          for col, asc in reversed(list(zip(columns, ascending)))]
+
+
+def _select(keys, k, tie_keys):
+    """Positions of the ``k`` smallest ``keys``, fully ordered."""
+    n = len(keys)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = keys[np.argpartition(keys, k - 1)[:k]].max()
+        candidates = np.flatnonzero(keys <= kth)  # Everything tied with the K-th value
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort([tie[candidates] for tie in tie_keys] + [keys[candidates]])
+    return candidates[order][:k]
+
+
+def top_k_positions(frame, column, k=5, ascending=False, tie_break='first', tie_ascending=True):
+    """Integer positions of the top ``k`` rows of ``frame`` by ``column``."""
+    keys = _rank_keys(frame[column].to_numpy(), ascending)
+    positions = np.arange(len(frame))
+    ties = [np.asarray(tie) for tie in _tie_keys(frame, positions, tie_break, tie_ascending)]
+    return _select(keys, k, ties)
+
+
+def top_k(frame, column, k=5, ascending=False, tie_break='first', tie_ascending=True):
+    """Equivalent of ``frame.sort_values(column, ascending).head(k)``."""
+    return frame.iloc[top_k_positions(frame, column, k, ascending, tie_break, tie_ascending)]
+
+
+def top_k_many(frame, columns, k=5, ascending=False, tie_break='first', tie_ascending=True):
+    """Top ``k`` rows for several ranking columns, partitioned in one pass.
+
+    Returns ``{column: frame}``.
+    """
+    columns = list(columns)
+    keys = _rank_keys(frame[columns].to_numpy(dtype=np.float64), ascending)
+    n = len(frame)
+    positions = np.arange(n)
+    ties = [np.asarray(tie) for tie in _tie_keys(frame, positions, tie_break, tie_ascending)]
+    if 0 < k < n:
+        # One argpartition over the (rows, metrics) block gives every metric's K-th value
+        kths = np.take_along_axis(keys, np.argpartition(keys, k - 1, axis=0)[:k], axis=0).max(axis=0)
+    result = {}
+    for j, column in enumerate(columns):
+        col_keys = keys[:, j]
+        if 0 < k < n:
+            candidates = np.flatnonzero(col_keys <= kths[j])
+        else:
+            candidates = positions if k > 0 else positions[:0]
+        order = np.lexsort([tie[candidates] for tie in ties] + [col_keys[candidates]])
+        result[column] = frame.iloc[candidates[order][:k]]
+    return result
+
+
+def grouped_top_k(frame, by, column, k=5, ascending=False, tie_break='first', tie_ascending=True):
+    """Top ``k`` rows by ``column`` within each group of ``by`` (e.g. counties per state).
+
+    Groups come out in order of first appearance, rows ranked within each
+    group. Each group is partitioned on its own, so only its K candidates are
+    sorted.
+    """
+    codes, uniques = pd.factorize(frame[by], sort=False)
+    keys = _rank_keys(frame[column].to_numpy(), ascending)
+    positions = np.arange(len(frame))
+    ties = [np.asarray(tie) for tie in _tie_keys(frame, positions, tie_break, tie_ascending)]
+    # Integer group codes make rows of one group contiguous, still in frame order within the group
+    members = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[members], np.arange(len(uniques) + 1))
+    selected = [np.empty(0, dtype=np.intp)]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        group = members[start:stop]
+        selected.append(group[_select(keys[group], k, [tie[group] for tie in ties])])
+    return frame.iloc[np.concatenate(selected)]
@@ -0,0 +1,115 @@
+"""Watch the workbook and rebuild only the charts an edit affects.
+
+    python all_visuals.py --watch
+    python -m pcid render --watch
+
+The workbook is polled (stat only, no extra dependency) and a change is
+acted on once the file has stopped changing for ``debounce`` seconds, so the
+several writes of one Excel save trigger a single rebuild. The rebuild goes
+through the build graph of ``pcid.pipeline``: the metrics are re-extracted,
+each top-N selection, cut down to the columns its chart draws, is compared
+by content with the previous one, and only the visuals whose drawn states or
+values changed are re-rendered (through the chart cache, so reverting an
+edit re-renders nothing at all). The cells
+that changed are printed as a diff of the metrics table.
+
+An ``.xlsx`` is one zip archive, so the changed sheet has to be re-read as a
+whole; everything after the read is incremental.
+"""
+
+import os
+import time
+import zipfile
+
+import numpy as np
+
+from pcid.build import BUILT
+
+
+def snapshot(paths):
+    """``{path: (mtime_ns, size)}``, or None for a path that does not exist right now."""
+    stats = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+            stats[path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stats[path] = None
+    return stats
+
+
+def _complete(path):
+    # Excel and openpyxl can pause for seconds mid-save; an .xlsx is only
+    # readable once the zip's central directory at the end has been written
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        return zipfile.is_zipfile(path)
+    return True
+
+
+def wait_for_change(paths, previous, interval=0.5, debounce=1.0):
+    """Block until ``paths`` differ from ``previous`` and then stay unchanged for ``debounce`` seconds."""
+    while True:
+        time.sleep(interval)
+        current = snapshot(paths)
+        if current == previous:
+            continue
+        settled_at = time.monotonic()
+        while time.monotonic() - settled_at < debounce:
+            time.sleep(interval)
+            latest = snapshot(paths)
+            if latest != current:
+                current, settled_at = latest, time.monotonic()
+        if all(stat is not None and _complete(path) for path, stat in current.items()):
+            return current
+        previous = current  # Deleted or half-written mid-save: wait for the next write
+
+
+def diff_metrics(old, new):
+    """Changed cells between two metrics frames, as ``[(state, column, old, new), ...]``."""
+    if old is None or list(old.columns) != list(new.columns) or len(old) != len(new) \
+            or not (old['State'].astype(str).to_numpy() == new['State'].astype(str).to_numpy()).all():
+        return None  # Different shape: not comparable cell by cell
+    columns = list(new.columns[1:])
+    before = old[columns].to_numpy(dtype=np.float64)
+    after = new[columns].to_numpy(dtype=np.float64)
+    changed = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+    states = new['State'].astype(str).to_numpy()
+    return [(states[i], columns[j], before[i, j], after[i, j]) for i, j in zip(*np.nonzero(changed))]
+
+
+def _report(status, diff, seconds, log, limit=10):
+    if diff is None:
+        log('Metrics table changed shape; rebuilt from scratch')
+    elif diff:
+        log(f'{len(diff)} metric value(s) changed:')
+        for state, column, before, after in diff[:limit]:
+            log(f'  {state:<22} {column:<28} {before:g} -> {after:g}')
+        if len(diff) > limit:
+            log(f'  ... and {len(diff) - limit} more')
+    else:
+        log('Workbook saved without changing any metric')
+    rebuilt = [name for name, result in status.items() if name.startswith('visual') and result == BUILT]
+    log(f'Updated {", ".join(rebuilt) if rebuilt else "no charts"} in {seconds:.2f}s')
+
+
+def watch(path, out_dir='.', n=5, rank_by=None, targets=None, interval=0.5, debounce=1.0, log=print):
+    """Build the visuals, then rebuild the affected ones after every saved edit until interrupted."""
+    from pcid.metrics import load_metrics
+    from pcid.pipeline import visuals_graph
+
+    graph = visuals_graph(path, out_dir=out_dir, n=n, rank_by=rank_by)
+    graph.build(targets)
+    previous = load_metrics(path)
+    state = snapshot([path])
+    log(f'Watching {path} (Ctrl+C to stop)')
+    while True:
+        state = wait_for_change([path], state, interval, debounce)
+        started = time.perf_counter()
+        try:
+            status = graph.build(targets)
+        except Exception as exc:  # Usually a save still in progress; the next write triggers a retry
+            log(f'Workbook not readable yet ({exc!r}); keeping the previous charts until the next save')
+            continue
+        current = graph.values.get('metrics', previous)
+        _report(status, diff_metrics(previous, current), time.perf_counter() - started, log)
+        previous = current
@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from pcid.ingest import DEFAULT_WORKBOOK, load_workbook_frame  # noqa: E402
+from pcid.metrics import build_metrics  # noqa: E402
+
+WORKBOOK = os.path.join(ROOT, DEFAULT_WORKBOOK)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep every test's ingest cache, build stamps and store out of the repo."""
+    path = tmp_path / 'cache'
+    monkeypatch.setenv('PCID_CACHE_DIR', str(path))
+    return str(path)
+
+
+@pytest.fixture
+def workbook_copy(tmp_path):
+    """A private copy of the bundled workbook that a test may edit or touch."""
+    path = tmp_path / 'workbook.xlsx'
+    shutil.copyfile(WORKBOOK, path)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def sheet(tmp_path_factory):
+    """The bundled sheet as ``load_workbook_frame`` returns it (parsed once per session)."""
+    return load_workbook_frame(WORKBOOK, cache_dir=str(tmp_path_factory.mktemp('sheet_cache')))
+
+
+@pytest.fixture(scope='session')
+def df_metrics(sheet):
+    return build_metrics(sheet)
+
+
+def edit_workbook(path, geography, label, cells):
+    """Overwrite cells of ``geography``'s block in the row labelled ``label``: ``{column offset: value}``."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path)
+    ws = wb['Data']
+    column = next(cell.column for cell in ws[1] if cell.value == geography)
+    row = next(cell.row for cell in ws['A'] if cell.value == label)
+    for offset, value in cells.items():
+        ws.cell(row, column + offset, value)
+    wb.save(path)
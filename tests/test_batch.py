@@ -0,0 +1,56 @@
+import csv
+import json
+import os
+import shutil
+
+import numpy as np
+
+from pcid import batch, ingest
+from tests.conftest import WORKBOOK
+
+
+def test_parallel_batch_shares_one_cache_dir(tmp_path, cache_dir):
+    data = tmp_path / 'data'
+    data.mkdir()
+    for i, year in enumerate((2019, 2020, 2021)):
+        path = data / f'acs_{year}_state.xlsx'
+        shutil.copyfile(WORKBOOK, path)
+        with open(path, 'ab') as fh:  # A distinct digest, hence a distinct sheet cache, per copy
+            fh.write(b'\0' * (i + 1))
+
+    table = batch.run_batch([str(data)], max_workers=3)
+
+    assert sorted(table['year'].unique()) == [2019, 2020, 2021]
+    assert table.groupby('year').size().nunique() == 1
+    with open(os.path.join(cache_dir, 'index.json')) as fh:
+        index = json.load(fh)
+    assert sorted(index) == sorted(str(path) for path in data.iterdir())
+    names = os.listdir(cache_dir)
+    assert not [name for name in names if '.tmp' in name]
+    assert len([name for name in names if name.startswith('sheet-') and name.endswith('.npy')]) == 3
+
+
+def test_prune_keeps_in_flight_writes(workbook_copy, cache_dir):
+    ingest.load_workbook_frame(workbook_copy)
+    in_flight = os.path.join(cache_dir, f'sheet-{"0" * 24}-v{ingest.CACHE_VERSION}.npy.999.tmp.npy')
+    stale = os.path.join(cache_dir, f'sheet-{"0" * 24}-v{ingest.CACHE_VERSION}.npy')
+    for path in (in_flight, stale):
+        open(path, 'wb').close()
+
+    ingest.prune_cache(cache_dir)
+    assert os.path.exists(in_flight)
+    assert not os.path.exists(stale)
+
+
+def test_batch_csv_keeps_the_sheet_values(workbook_copy, tmp_path, df_metrics):
+    out = tmp_path / 'metrics_long.csv'
+    batch.main([workbook_copy, '--out', str(out)])
+
+    with open(out, newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    float32_metrics = set(df_metrics.columns[df_metrics.dtypes == np.float32])
+    texts = [row['value'] for row in rows if row['metric'] in float32_metrics]
+    assert len(texts) == len(float32_metrics) * len(df_metrics)
+    # Each value is written at the float32's shortest repr, e.g. 95.1 rather than 95.0999984741211
+    assert all(text == repr(float(str(np.float32(text)))) for text in texts)
+    assert 'Alaska,Income_75k+_BB_Pct,95.1\n' in out.read_text()
@@ -0,0 +1,64 @@
+import os
+
+from pcid.build import BUILT, SKIPPED, BuildGraph, Stage
+from pcid.pipeline import VISUALS, visuals_graph
+
+calls = []
+
+
+def source(value):
+    calls.append('source')
+    return value
+
+
+def parity(x):
+    calls.append('parity')
+    return x % 2
+
+
+def write(p, path):
+    calls.append('write')
+    with open(path, 'w') as fh:
+        fh.write(str(p))
+
+
+def graph_for(tmp_path, value):
+    graph = BuildGraph(str(tmp_path / 'stamps.json'))
+    graph.add(Stage('source', source, params={'value': value}))
+    graph.add(Stage('parity', parity, inputs={'x': 'source'}))
+    graph.add(Stage('out', write, inputs={'p': 'parity'}, params={'path': str(tmp_path / 'out.txt')},
+                    output=str(tmp_path / 'out.txt')))
+    return graph
+
+
+def test_unchanged_graph_is_skipped(tmp_path):
+    calls.clear()
+    assert set(graph_for(tmp_path, 3).build(workers=1).values()) == {BUILT}
+    assert graph_for(tmp_path, 3).build(workers=1) == {'source': SKIPPED, 'parity': SKIPPED, 'out': SKIPPED}
+    assert calls == ['source', 'parity', 'write']
+
+
+def test_early_cutoff_when_an_intermediate_result_is_unchanged(tmp_path):
+    graph_for(tmp_path, 3).build(workers=1)
+    calls.clear()
+    status = graph_for(tmp_path, 5).build(workers=1)  # Same parity, so the file is still current
+    assert status == {'source': BUILT, 'parity': BUILT, 'out': SKIPPED}
+    assert calls == ['source', 'parity']
+
+
+def test_missing_output_is_rebuilt(tmp_path):
+    graph_for(tmp_path, 3).build(workers=1)
+    os.remove(tmp_path / 'out.txt')
+    assert graph_for(tmp_path, 3).build(workers=1)['out'] == BUILT
+    assert (tmp_path / 'out.txt').read_text() == '1'
+
+
+def test_visuals_graph_builds_once(workbook_copy, tmp_path):
+    out_dir = tmp_path / 'charts'
+    out_dir.mkdir()
+    first = visuals_graph(workbook_copy, out_dir=str(out_dir)).build()
+    assert all(first[visual] == BUILT for visual in VISUALS)
+    assert sorted(os.listdir(out_dir)) == sorted(filename for filename, _ in VISUALS.values())
+
+    second = visuals_graph(workbook_copy, out_dir=str(out_dir)).build()
+    assert set(second.values()) == {SKIPPED}
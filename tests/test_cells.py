@@ -0,0 +1,35 @@
+import numpy as np
+
+from pcid.cells import parse_cells
+
+
+def test_acs_cell_formats():
+    cells = np.array(['1,234', '±567', '12.3%', '250,000+', '2,500-', '-12.5', '(X)', 'N', '-', '*****', '',
+                      None, np.nan, 42, 7.5, ' 1 234 '], dtype=object)
+    values, missing = parse_cells(cells)
+
+    assert missing.tolist() == [False] * 6 + [True] * 7 + [False] * 3
+    np.testing.assert_array_equal(values[~missing], [1234, 567, 12.3, 250000, 2500, -12.5, 42, 7.5, 1234])
+    assert np.isnan(values[missing]).all()
+
+
+def test_unexpected_tokens_are_masked():
+    values, missing = parse_cells(np.array([['12', 'n/a'], ['3.5', '1e3']], dtype=object))
+    assert values.shape == missing.shape == (2, 2)
+    assert missing.tolist() == [[False, True], [False, False]]
+    assert values[0, 0] == 12 and values[1, 1] == 1000
+
+
+def test_missing_cells_are_zero_in_metrics_and_flagged(sheet):
+    from pcid.extract import extract_metrics
+    from pcid.layout import TableLayout
+
+    layout = TableLayout.from_frame(sheet)
+    df = sheet.copy()
+    row, offset = layout.locate('Smartphone', 'Percent')
+    df.iat[row, layout.positions['Utah'] + offset] = '(X)'
+    metrics, flags = extract_metrics(df, {'Smartphone_Pct': ('Smartphone', 'Percent')}, layout=layout,
+                                     with_missing=True)
+    utah = metrics['State'] == 'Utah'
+    assert metrics.loc[utah, 'Smartphone_Pct'].item() == 0
+    assert flags['Smartphone_Pct'].sum() == 1 and flags.loc[utah, 'Smartphone_Pct'].item()
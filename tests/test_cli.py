@@ -0,0 +1,46 @@
+import pytest
+
+from pcid import cli, pipeline
+from pcid.render import _new_figure, draw_device_ownership
+from pcid.selection import top_device_ownership
+
+
+def test_export_metrics_subset(workbook_copy, capsys):
+    assert cli.main(['export-metrics', '--input', workbook_copy, '--metrics', 'Smartphone_Pct']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'State,Smartphone_Pct' and len(lines) == 52
+
+
+def test_export_metrics_json_keeps_the_sheet_values(workbook_copy, capsys):
+    assert cli.main(['export-metrics', '--input', workbook_copy, '--metrics', 'Income_75k+_BB_Pct',
+                     '--format', 'json']) == 0
+    assert capsys.readouterr().out.splitlines()[1] == '{"State":"Alaska","Income_75k+_BB_Pct":95.1}'
+
+
+@pytest.mark.parametrize('argv', [['export-metrics', '--metrics', 'Nope'], ['render', '--metric', 'Nope']])
+def test_unknown_metric_is_a_clean_error(workbook_copy, argv):
+    with pytest.raises(SystemExit, match='unknown metric or row: Nope'):
+        cli.main(argv + ['--input', workbook_copy])
+
+
+def test_internal_key_errors_are_not_swallowed(workbook_copy, tmp_path, monkeypatch):
+    def broken(*args, **kwargs):
+        raise KeyError('bug')
+
+    monkeypatch.setattr(pipeline, 'visuals_graph', broken)
+    with pytest.raises(KeyError, match='bug'):
+        cli.main(['render', '--input', workbook_copy, '--out', str(tmp_path)])
+
+
+def test_render_metric_sets_the_title(workbook_copy, tmp_path, df_metrics):
+    out = tmp_path / 'charts'
+    argv = ['render', '--charts', '2', '--metric', 'Smartphone_Pct', '--input', workbook_copy, '--out', str(out)]
+    assert cli.main(argv) == 0
+    assert (out / 'visual2_device_ownership.png').stat().st_size > 0
+
+    fig = _new_figure()
+    draw_device_ownership(fig, top_device_ownership(df_metrics, by='Smartphone_Pct'), 'Smartphone_Pct')
+    assert fig.axes[0].get_title() == 'Device Ownership (Top 5 States ordered by Smartphone_Pct)'
+    fig = _new_figure()
+    draw_device_ownership(fig, top_device_ownership(df_metrics))
+    assert fig.axes[0].get_title() == 'Device Ownership (Top 5 States ordered by Desktop/Laptop %)'
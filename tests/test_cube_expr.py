@@ -0,0 +1,72 @@
+import re
+
+import numpy as np
+import pytest
+
+from pcid.cube import ROLE_ORDER, TableCube
+from pcid.expr import ExpressionError, derive, evaluate, parse
+
+
+@pytest.fixture(scope='module')
+def cube(sheet):
+    return TableCube.from_frame(sheet)
+
+
+def test_cube_matches_metrics(cube, df_metrics):
+    assert cube.shape == (51, 31, 4)
+    assert cube.roles == list(ROLE_ORDER)
+    assert cube.geographies == df_metrics['State'].astype(str).tolist()
+    np.testing.assert_array_equal(cube.get('Smartphone'), df_metrics['Smartphone'])
+    np.testing.assert_allclose(cube.get('Satellite Internet service', 'Percent'), df_metrics['Satellite_Pct'],
+                               rtol=1e-6)
+    np.testing.assert_array_equal(cube.get('$75,000 or more / With a broadband Internet subscription'),
+                                  df_metrics['Income_75k+_BB'])
+    with pytest.raises(KeyError, match='ambiguous'):
+        cube.get('With a broadband Internet subscription')
+
+
+def test_expressions_are_whole_array_formulas(cube, df_metrics):
+    gap = evaluate('Optic_DSL - Satellite', cube, {'Optic_DSL': ('Broadband such as cable, fiber optic or DSL',
+                                                                 'Estimate'),
+                                                   'Satellite': ('Satellite Internet service', 'Estimate')})
+    np.testing.assert_array_equal(gap, df_metrics['Optic_Satellite_Gap'])
+
+    frame = derive(cube, {'Share': "est('Satellite Internet service') / est('Total households')",
+                          'Share_Pct': '100 * Share',
+                          'Gap_MOE': 'moe_sum(Optic_DSL_MOE, Satellite_MOE)'})
+    np.testing.assert_allclose(frame['Share_Pct'], 100 * cube.get('Satellite Internet service')
+                               / cube.get('Total households'))
+    np.testing.assert_allclose(frame['Gap_MOE'], df_metrics['Optic_Satellite_Gap_MOE'], rtol=1e-6)
+
+
+def test_division_by_zero_is_missing(cube):
+    assert np.isnan(evaluate("est('Total households') / 0", cube)).all()
+
+
+@pytest.mark.parametrize('expression', [
+    "__import__('os').system('true')",
+    "est('Smartphone').__class__",
+    "open('x')",
+    "[1, 2]",
+    "lambda: 1",
+    "est(label='Smartphone')",
+    "'text'",
+    "1 +",
+])
+def test_unsafe_or_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ExpressionError):
+        parse(expression)
+
+
+def test_unknown_names(cube):
+    with pytest.raises(ExpressionError, match='Unknown metric'):
+        evaluate('Nope + 1', cube)
+    with pytest.raises(KeyError):
+        evaluate("est('Carrier pigeon')", cube)
+
+
+def test_metric_names_that_are_not_identifiers(cube, df_metrics):
+    call = "pct('$75,000 or more / With a broadband Internet subscription')"
+    with pytest.raises(ExpressionError, match=re.escape(f'{call} for Income_75k+_BB_Pct')):
+        derive(cube, {'X': 'Income_75k+_BB_Pct'})
+    np.testing.assert_allclose(derive(cube, {'X': call})['X'], df_metrics['Income_75k+_BB_Pct'], rtol=1e-6)
@@ -0,0 +1,81 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pcid.export import ESTIMATE_DTYPE, TIDY_COLUMNS, base_metrics, export_tidy, tidy_metrics, write_ndjson
+from tests.conftest import edit_workbook
+
+
+def test_tidy_shape_and_values(df_metrics):
+    tidy = tidy_metrics(df_metrics, 2020)
+    names = base_metrics(df_metrics)
+    assert list(tidy.columns) == TIDY_COLUMNS
+    assert len(tidy) == len(names) * len(df_metrics)
+
+    row = tidy[(tidy['geography'] == 'Utah') & (tidy['metric'] == 'Smartphone')].iloc[0]
+    utah = df_metrics[df_metrics['State'] == 'Utah'].iloc[0]
+    assert row['estimate'] == utah['Smartphone']
+    assert row['moe'] == utah['Smartphone_MOE']
+    assert row['percent'] == utah['Smartphone_Pct']
+    assert row['year'] == 2020
+
+
+def test_estimate_dtype_does_not_depend_on_missing_values(df_metrics):
+    partial = df_metrics.drop(columns=['Satellite'])  # Satellite's estimate becomes missing
+    for frame in (df_metrics, partial):
+        assert tidy_metrics(frame)['estimate'].dtype == ESTIMATE_DTYPE
+    assert tidy_metrics(partial).query('metric == "Satellite"')['estimate'].isna().all()
+
+
+def test_ndjson_is_shortest_repr_and_chunked(df_metrics):
+    tidy = tidy_metrics(df_metrics, 2020)
+    out = io.StringIO()
+    assert write_ndjson(tidy, out, chunk_rows=100) == len(tidy)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert len(records) == len(tidy)
+    assert records[0] == {'year': 2020, 'geo_level': 'state', 'geography': 'Alabama', 'metric': 'Desktop_Laptop',
+                          'estimate': 1301084.0, 'moe': 8701.0, 'percent': 68.9, 'percent_moe': 0.3}
+
+
+def test_suppressed_cells_are_null(workbook_copy, tmp_path):
+    edit_workbook(workbook_copy, 'Utah', 'Smartphone', {0: '(X)', 3: '*****'})
+    out = tmp_path / 'tidy.ndjson'
+    export_tidy(workbook_copy, str(out), 'ndjson')
+    records = [json.loads(line) for line in out.read_text().splitlines()]
+
+    utah = next(r for r in records if r['geography'] == 'Utah' and r['metric'] == 'Smartphone')
+    assert utah['estimate'] is None and utah['percent_moe'] is None
+    assert utah['moe'] > 0 and utah['percent'] > 0
+    assert sum(value is None for r in records for value in r.values()) == 2
+
+
+def test_export_reads_the_year_without_a_full_parse(workbook_copy, tmp_path, monkeypatch):
+    import pcid.ingest
+
+    def no_full_parse(*args, **kwargs):
+        raise AssertionError('export_tidy parsed the workbook just for its year')
+
+    monkeypatch.setattr(pcid.ingest, 'load_workbook_frame', no_full_parse)
+    out = tmp_path / 'tidy.csv'
+    export_tidy(workbook_copy, str(out), 'csv')
+    assert set(pd.read_csv(out)['year']) == {2020}
+
+
+def test_parquet_round_trip(df_metrics, tmp_path):
+    pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    from pcid.export import write_parquet
+
+    tidy = tidy_metrics(df_metrics, 2020)
+    path = write_parquet(tidy, str(tmp_path / 'tidy.parquet'), row_group_size=200)
+    back = pd.read_parquet(path)
+    assert list(back.columns) == TIDY_COLUMNS
+    np.testing.assert_array_equal(back['estimate'].to_numpy(), tidy['estimate'].to_numpy())
+    assert back['geography'].astype(str).tolist() == tidy['geography'].astype(str).tolist()
+    metadata = pq.ParquetFile(path).metadata
+    assert metadata.num_row_groups > 1
+    assert metadata.row_group(0).column(TIDY_COLUMNS.index('estimate')).statistics.has_min_max
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from pcid import ingest
+from pcid.cells import parse_cells
+from tests.conftest import WORKBOOK
+
+
+def test_cached_frame_matches_read_excel(workbook_copy, cache_dir):
+    expected = pd.read_excel(WORKBOOK, dtype=object)
+    first = ingest.load_workbook_frame(workbook_copy)
+    second = ingest.load_workbook_frame(workbook_copy)  # Served from the cache
+    pd.testing.assert_frame_equal(first, second)
+    assert list(first.columns) == [str(c) for c in expected.columns]
+    assert first.shape == expected.shape
+
+    # Labels and text cells verbatim, data cells as the numbers they parse to
+    pd.testing.assert_series_equal(first.iloc[:, 0], expected.iloc[:, 0].astype(object), check_names=False)
+    cells, expected_cells = first.iloc[:, 1:].to_numpy(), expected.iloc[:, 1:].to_numpy()
+    values, missing = parse_cells(cells)
+    expected_values, expected_missing = parse_cells(expected_cells)
+    np.testing.assert_array_equal(values, expected_values)
+    np.testing.assert_array_equal(missing, expected_missing)
+    text = expected_missing & pd.notna(expected_cells)
+    assert text.any() and (cells[text] == expected_cells[text]).all()
+
+
+def test_cache_is_eight_bytes_a_data_cell(workbook_copy, cache_dir):
+    df = ingest.load_workbook_frame(workbook_copy)
+    array_path, meta_path = ingest._cache_paths(cache_dir, ingest.source_digest(workbook_copy))
+    # Not one fixed-width string per cell sized by the longest label
+    assert os.path.getsize(array_path) <= 8 * df.iloc[:, 1:].size + 128
+    assert os.path.getsize(meta_path) < os.path.getsize(array_path)
+
+
+def test_source_digest_reuses_index_until_file_changes(workbook_copy, cache_dir, monkeypatch):
+    sha = ingest.source_digest(workbook_copy)
+    assert sha == ingest.file_digest(workbook_copy)
+
+    calls = []
+    monkeypatch.setattr(ingest, 'file_digest', lambda path: calls.append(path) or 'x' * 64)
+    assert ingest.source_digest(workbook_copy) == sha
+    assert calls == []
+
+    with open(workbook_copy, 'ab') as fh:
+        fh.write(b'\0')
+    assert ingest.source_digest(workbook_copy) == 'x' * 64
+    assert calls == [workbook_copy]
+
+
+def test_edited_workbook_rebuilds_and_prunes_old_cache(workbook_copy, cache_dir):
+    ingest.load_workbook_frame(workbook_copy)
+    old_sha = ingest.source_digest(workbook_copy)
+
+    with open(workbook_copy, 'ab') as fh:  # openpyxl ignores trailing bytes after the zip
+        fh.write(b'\0')
+    ingest.load_workbook_frame(workbook_copy)
+    new_sha = ingest.source_digest(workbook_copy)
+
+    names = os.listdir(cache_dir)
+    assert new_sha != old_sha
+    assert any(new_sha[:24] in name for name in names)
+    assert not any(old_sha[:24] in name for name in names)
+
+
+def test_corrupt_cache_entry_is_rebuilt(workbook_copy, cache_dir):
+    expected = ingest.load_workbook_frame(workbook_copy)
+    array_path, _ = ingest._cache_paths(cache_dir, ingest.source_digest(workbook_copy))
+    with open(array_path, 'wb') as fh:
+        fh.write(b'not an array')
+
+    df = ingest.load_workbook_frame(workbook_copy)
+    pd.testing.assert_frame_equal(df, expected)
+    assert np.load(array_path).shape == (expected.shape[0], expected.shape[1] - 1)
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pcid import moe
+
+
+def test_moe_formulas():
+    np.testing.assert_allclose(moe.moe_sum([3, 6], [4, 8]), [5, 10])
+    p = 8200 / 31000
+    assert moe.moe_proportion(8200, 31000, 460, 990) == pytest.approx(np.sqrt(460 ** 2 - p ** 2 * 990 ** 2) / 31000)
+    # Negative radicand falls back to the ratio formula
+    assert moe.moe_proportion(90, 100, 1, 10) == pytest.approx(moe.moe_ratio(90, 100, 1, 10))
+    low, high = moe.confidence_interval([100.0], [10.0])
+    assert (low[0], high[0]) == (90, 110)
+    assert moe.rescale_moe(1.645, 0.95) == pytest.approx(1.96, abs=1e-3)
+    assert moe.significantly_different(100, 3, 94, 4).item()
+    assert not moe.significantly_different(100, 3, 96, 4).item()
+
+
+def test_rank_bounds():
+    best, worst = moe.rank_bounds([100, 99, 50], [5, 5, 1])
+    assert best.tolist() == [1, 1, 3]
+    assert worst.tolist() == [2, 2, 3]
+
+
+def test_significant_top_k_includes_ties_and_drops_missing_rows():
+    frame = pd.DataFrame({
+        'State': ['A', 'B', 'C', 'D', 'E', 'F'],
+        'Value': [90.0, 80.0, 79.0, 50.0, np.nan, 70.0],
+        'Value_MOE': [1.0, 1.0, 1.0, 1.0, 1.0, np.nan],
+    })
+    result = moe.significant_top_k(frame, 'Value', 'Value_MOE', k=2)
+
+    assert result['State'].tolist() == ['A', 'B', 'C']
+    assert result['Rank'].tolist() == [1, 2, 3]
+    assert result['Rank_Best'].tolist() == [1, 2, 2]
+    assert result['In_Top_K'].tolist() == [True, False, False]
+
+
+def test_gap_moe_uses_the_difference_formula(df_metrics):
+    expected = np.sqrt(df_metrics['Optic_DSL_MOE'].astype(float) ** 2 + df_metrics['Satellite_MOE'].astype(float) ** 2)
+    np.testing.assert_allclose(df_metrics['Optic_Satellite_Gap_MOE'], expected, rtol=1e-6)
+
+
+def test_significant_top_k_skips_suppressed_cells(sheet):
+    from pcid.layout import TableLayout
+    from pcid.metrics import build_metrics
+
+    layout = TableLayout.from_frame(sheet)
+    df = sheet.copy()
+    row, offset = layout.locate('Desktop or laptop', 'Percent Margin of Error')
+    df.iat[row, layout.positions['Utah'] + offset] = '*****'
+    df_metrics, missing = build_metrics(df, with_missing=True)
+    utah = df_metrics['State'] == 'Utah'
+    assert df_metrics.loc[utah, 'Desktop_Laptop_Pct_MOE'].item() == 0
+    assert missing.loc[utah, 'Desktop_Laptop_Pct_MOE'].item()
+    # Read as an exact estimate, the 0 MOE would make Utah a sure member of the top 5
+    unmasked = moe.significant_top_k(df_metrics, 'Desktop_Laptop_Pct', 'Desktop_Laptop_Pct_MOE')
+    assert unmasked.set_index('State').loc['Utah', 'In_Top_K']
+
+    result = moe.significant_top_k(df_metrics, 'Desktop_Laptop_Pct', 'Desktop_Laptop_Pct_MOE', missing=missing)
+    assert 'Utah' not in result['State'].tolist()
+    expected = moe.significant_top_k(df_metrics[~utah], 'Desktop_Laptop_Pct', 'Desktop_Laptop_Pct_MOE')
+    pd.testing.assert_frame_equal(result, expected)
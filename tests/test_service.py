@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import numpy as np
+import pytest
+
+from pcid.selection import top_device_ownership, top_income_broadband
+from pcid.service import MetricsService, QueryError, query_top, start_server
+
+
+async def get(port, target):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), body
+
+
+def run(service, client):
+    async def main():
+        server = await start_server(service, port=0)
+        async with server:
+            return await client(server.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def service(workbook_copy):
+    return MetricsService(workbook_copy)
+
+
+def test_queries(service, df_metrics):
+    answer = service.query('top', {'metric': 'Desktop_Laptop_Pct', 'n': '3'})
+    assert [row['State'] for row in answer['result']] == ['Utah', 'Colorado', 'Washington']
+    assert service.query('top', {'metric': 'Desktop_Laptop_Pct', 'n': '3'}) is answer
+    assert service.hits == 1
+    utah = df_metrics.loc[df_metrics['State'] == 'Utah', 'Smartphone_Pct'].item()
+    assert service.query('state/Utah', {'metrics': 'Smartphone_Pct'})['result'] == {'State': 'Utah',
+                                                                                   'Smartphone_Pct': round(utah, 1)}
+    gap = service.query('gap', {'states': 'Utah,Maryland,Colorado'})['result']
+    assert sorted(row['State'] for row in gap) == ['Colorado', 'Maryland', 'Utah']
+    with pytest.raises(QueryError):
+        service.query('top', {'metric': 'Nope'})
+
+
+def test_top_breaks_ties_like_the_visuals(df_metrics):
+    everyone = len(df_metrics)
+    for select, metric in ((top_income_broadband, 'Income_75k+_BB_Pct'), (top_device_ownership, 'Desktop_Laptop_Pct')):
+        expected = select(df_metrics, everyone)['State'].tolist()
+        assert [row['State'] for row in query_top(df_metrics, metric, everyone)] == expected
+    # Without a TIE_BREAKS entry ties stay in frame order, not ordered by the percentage's count
+    tied = df_metrics.assign(Desktop_Laptop_Pct=np.float32(90.0))
+    assert [row['State'] for row in query_top(tied, 'Desktop_Laptop_Pct', 5)] == tied['State'].head(5).tolist()
+
+
+def test_http_status_codes(service):
+    async def client(port):
+        return [await get(port, target) for target in ('/states', '/top?metric=Nope', '/nowhere')]
+
+    (ok, body), (bad, _), (missing, _) = run(service, client)
+    assert (ok, bad, missing) == (200, 400, 404)
+    assert len(json.loads(body)['result']) == 51
+
+
+def test_slow_request_does_not_block_others(service, monkeypatch):
+    answer = service._answer
+
+    def slow_answer(route, params, df_metrics):
+        if route == 'slow':
+            time.sleep(1.5)  # Stands in for a workbook reload
+            return 'done'
+        return answer(route, params, df_metrics)
+
+    monkeypatch.setattr(service, '_answer', slow_answer)
+    service.frame()
+
+    async def client(port):
+        finished = []
+
+        async def fetch(target):
+            status, _ = await get(port, target)
+            finished.append((target, status))
+
+        slow = asyncio.create_task(fetch('/slow'))
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        await fetch('/states')
+        fast_seconds = time.perf_counter() - started
+        await slow
+        return finished, fast_seconds
+
+    finished, fast_seconds = run(service, client)
+    assert finished == [('/states', 200), ('/slow', 200)]
+    assert fast_seconds < 1.0
+
+
+def test_charts_render_in_the_pool_without_blocking(service):
+    from pcid.service import render_pool
+
+    service.frame()
+
+    async def client(port):
+        finished = []
+
+        async def fetch(target):
+            status, body = await get(port, target)
+            finished.append(target)
+            return status, body
+
+        chart = asyncio.create_task(fetch('/chart/visual2?n=4'))
+        await asyncio.sleep(0.1)
+        states = await fetch('/states')
+        return finished, states, await chart, await fetch('/chart/visual2?n=4')
+
+    with render_pool(1) as pool:
+        async def main():
+            server = await start_server(service, port=0, render_pool=pool)
+            async with server:
+                return await client(server.sockets[0].getsockname()[1])
+        finished, states, (status, png), (_, cached) = asyncio.run(main())
+
+    assert finished[:2] == ['/states', '/chart/visual2?n=4']
+    assert states[0] == status == 200
+    assert png.startswith(b'\x89PNG') and cached == png
+    content_type, direct = service.chart('visual2', {'n': '4'})
+    assert content_type == 'image/png' and direct == png
@@ -0,0 +1,63 @@
+import gc
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pcid.shared import _mapped, attach, published, render_many
+from tests.conftest import ROOT
+
+
+def test_attach_round_trips_as_read_only_views(df_metrics):
+    with published(df_metrics) as handle:
+        frame = attach(handle)
+        pd.testing.assert_frame_equal(frame, df_metrics)
+        block = _mapped[handle['shm']]
+        for name in frame.columns:
+            values = frame[name].array.codes if name == 'State' else frame[name].to_numpy()
+            assert np.shares_memory(values, block), name
+            assert not values.flags.writeable, name
+
+
+def test_frame_outlives_the_published_block(df_metrics):
+    with published(df_metrics) as handle:
+        frame = attach(handle)
+    gc.collect()
+    # The publisher closed and unlinked its block; the frame's own mapping is still readable
+    pd.testing.assert_frame_equal(frame, df_metrics)
+    name = handle['shm']
+    del frame
+    gc.collect()
+    assert name not in _mapped
+
+
+def test_no_buffer_error_at_exit():
+    script = textwrap.dedent('''
+        from pcid.metrics import load_metrics
+        from pcid.shared import attach, published
+
+        with published(load_metrics()) as handle:
+            frame = attach(handle)
+        print(frame['State'].iloc[0])
+    ''')
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'Alabama'
+    assert 'BufferError' not in result.stderr and 'Exception ignored' not in result.stderr
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_render_many(df_metrics, tmp_path, cache_dir, workers):
+    jobs = {str(tmp_path / f'state_{i}.png'): ('device_ownership', [i]) for i in range(3)}
+    jobs[str(tmp_path / 'top.png')] = ('income_broadband', [5, 20, 44])
+    with published(df_metrics) as handle:
+        paths = render_many(handle, jobs, workers=workers, cache_dir=cache_dir)
+    assert paths == list(jobs)
+    for path in paths:
+        with open(path, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+        assert os.path.getsize(path) > 1000
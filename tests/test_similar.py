@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from pcid.cube import TableCube
+from pcid.layout import TableLayout
+from pcid.similar import kmeans, nearest, pairwise_distances, peer_groups, profile_features, similar_geographies
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(3)
+    points = rng.normal(size=(60, 4))
+    return np.concatenate([points, points[[5, 5, 17]]])  # Rows 60 and 61 duplicate row 5, row 62 row 17
+
+
+@pytest.mark.parametrize('chunk', [7, 2048])
+def test_nearest_matches_brute_force(points, chunk):
+    k = 6
+    indices, distances = nearest(points, k, chunk=chunk, use_tree=False)
+    full = pairwise_distances(points)
+    assert indices.shape == distances.shape == (len(points), k)
+    for query in range(len(points)):
+        others = np.delete(np.arange(len(points)), query)
+        expected = np.sort(full[query, others])[:k]
+        # Duplicates make equal distances, so compare distances and check each index against them
+        np.testing.assert_allclose(distances[query], expected, atol=1e-9)
+        np.testing.assert_allclose(full[query, indices[query]], distances[query], atol=1e-9)
+        assert query not in indices[query]
+    # A duplicate's nearest neighbours start with its twins, at distance 0
+    assert set(indices[5, :2]) == {60, 61} and distances[5, :2].tolist() == [0, 0]
+    assert indices[62, 0] == 17
+
+
+def test_nearest_with_k_at_least_n(points):
+    small = points[:8]
+    indices, distances = nearest(small, k=20, use_tree=False)
+    assert indices.shape == (8, 7)
+    for query in range(8):
+        assert sorted(indices[query]) == [i for i in range(8) if i != query]
+        assert (np.diff(distances[query]) >= 0).all()
+
+
+def test_nearest_with_a_tree_matches_brute_force(points):
+    pytest.importorskip('scipy')
+    _, tree = nearest(points, 6, use_tree=True)
+    _, brute = nearest(points, 6, use_tree=False)
+    np.testing.assert_allclose(tree, brute, atol=1e-9)
+
+
+def test_profile_features_drops_constant_columns(sheet):
+    layout = TableLayout.from_frame(sheet)
+    df = sheet.copy()
+    row, offset = layout.locate('Satellite Internet service', 'Percent')
+    _, positions = layout.geography_positions()
+    for position in positions:
+        df.iat[row, position + offset] = '5.0%'
+    cube = TableCube.from_frame(df)
+
+    labels, scaled = profile_features(cube)
+    assert 'Satellite Internet service' not in labels
+    assert 'Smartphone' in labels and scaled.shape == (len(cube.geographies), len(labels))
+    np.testing.assert_allclose(scaled.mean(axis=0), 0, atol=1e-9)
+    np.testing.assert_allclose(scaled.std(axis=0), 1, atol=1e-9)
+
+
+def test_kmeans_is_deterministic_for_a_seed(points):
+    labels, centers = kmeans(points, 4, seed=1)
+    again, again_centers = kmeans(points, 4, seed=1)
+    np.testing.assert_array_equal(labels, again)
+    np.testing.assert_array_equal(centers, again_centers)
+    # Converged: every point belongs to its closest center
+    closest = np.linalg.norm(points[:, np.newaxis, :] - centers[np.newaxis, :, :], axis=2).argmin(axis=1)
+    np.testing.assert_array_equal(labels, closest)
+
+
+def test_similar_geographies_and_peer_groups(sheet):
+    cube = TableCube.from_frame(sheet)
+    peers = similar_geographies(cube, 'Utah', k=3)
+    assert len(peers) == 3 and 'Utah' not in [name for name, _ in peers]
+    assert [d for _, d in peers] == sorted(d for _, d in peers)
+    groups = peer_groups(cube, clusters=4)
+    assert sorted(name for names in groups.values() for name in names) == sorted(cube.geographies)
+    with pytest.raises(KeyError):
+        similar_geographies(cube, 'Atlantis')
@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from pcid import store
+from pcid.selection import top_device_ownership, top_income_broadband, top_optic_satellite_gap
+from tests.conftest import edit_workbook
+
+
+@pytest.fixture
+def conn(tmp_path):
+    return store.connect(str(tmp_path / 'metrics.sqlite'))
+
+
+def test_load_is_idempotent(conn, workbook_copy, df_metrics):
+    rows = store.load_workbook(conn, workbook_copy)
+    assert rows == conn.execute('SELECT COUNT(*) FROM metrics').fetchone()[0] > 0
+    assert store.load_workbook(conn, workbook_copy) == 0
+    assert store.latest_year(conn) == 2020
+    utah = store.geography_metrics(conn, 'Utah')
+    assert utah['Smartphone']['estimate'] == df_metrics.loc[df_metrics['State'] == 'Utah', 'Smartphone'].item()
+
+
+def test_reloading_without_a_year_replaces_rows(conn, workbook_copy, monkeypatch):
+    import pcid.batch
+    monkeypatch.setattr(pcid.batch, 'workbook_year', lambda path: None)
+
+    rows = store.load_workbook(conn, workbook_copy)
+    with open(workbook_copy, 'ab') as fh:  # New digest, same year and level
+        fh.write(b'\0')
+    assert store.load_workbook(conn, workbook_copy) == rows
+    assert conn.execute('SELECT COUNT(*) FROM metrics').fetchone()[0] == rows
+    assert conn.execute('SELECT DISTINCT year FROM metrics').fetchall() == [(store.UNKNOWN_YEAR,)]
+    assert conn.execute('SELECT COUNT(*) FROM sources').fetchone()[0] == 1
+
+
+def test_top_n_orders_like_the_visuals(conn, workbook_copy, df_metrics):
+    store.load_workbook(conn, workbook_copy)
+    everyone = len(df_metrics)
+    for select, metric in ((top_income_broadband, 'Income_75k+_BB_Pct'), (top_device_ownership, 'Desktop_Laptop_Pct')):
+        expected = select(df_metrics, everyone)['State'].tolist()
+        assert [state for state, _ in store.top_n(conn, metric, everyone)] == expected
+
+    top1, top2 = top_income_broadband(df_metrics), top_device_ownership(df_metrics)
+    expected = top_optic_satellite_gap(df_metrics, [top1, top2])['State'].tolist()
+    states = set(top1['State']) | set(top2['State'])
+    assert [state for state, _ in store.top_n(conn, 'Optic_Satellite_Gap', geographies=states)] == expected
+
+    with pytest.raises(KeyError):
+        store.top_n(conn, 'Nope')
+
+
+def test_old_schema_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'old.sqlite')
+    old = sqlite3.connect(path)
+    old.execute('CREATE TABLE metrics (year INTEGER, geography TEXT)')
+    old.execute('INSERT INTO metrics VALUES (NULL, "Utah")')
+    old.commit()
+    old.close()
+
+    conn = store.connect(path)
+    assert conn.execute('SELECT COUNT(*) FROM metrics').fetchone()[0] == 0
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == store.SCHEMA_VERSION
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute('INSERT INTO metrics (year, geo_level, geography, metric) VALUES (NULL, "state", "Utah", "X")')
+
+
+def test_suppressed_cells_are_null_and_not_ranked(conn, workbook_copy, df_metrics):
+    edit_workbook(workbook_copy, 'Utah', 'Desktop or laptop', {2: '(X)'})
+    store.load_workbook(conn, workbook_copy)
+
+    assert store.geography_metrics(conn, 'Utah')['Desktop_Laptop']['percent'] is None
+    ranked = [name for name, _ in store.top_n(conn, 'Desktop_Laptop_Pct', n=len(df_metrics))]
+    assert len(ranked) == len(df_metrics) - 1 and 'Utah' not in ranked
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from pcid.extract import extract_metrics
+from pcid.layout import TableLayout
+from pcid.metrics import DERIVED, METRICS, build_metrics, clear_cache, load_metrics
+from pcid.stream import stream_metrics
+from tests.conftest import WORKBOOK
+
+
+def test_stream_matches_full_load(df_metrics):
+    streamed = stream_metrics(WORKBOOK, METRICS, derived=DERIVED)
+    pd.testing.assert_frame_equal(streamed, df_metrics)
+
+
+def test_qualified_labels_match_full_load(sheet):
+    metrics = {'BB_75k': ('$75,000 or more / With a broadband Internet subscription', 'Estimate'),
+               'BB_Under20k': ('Less than $20,000 / With a broadband Internet subscription', 'Percent')}
+    expected = extract_metrics(sheet, metrics, layout=TableLayout.from_frame(sheet))
+    pd.testing.assert_frame_equal(stream_metrics(WORKBOOK, metrics), expected)
+
+
+def test_ambiguous_label_raises_like_full_load(sheet):
+    metrics = {'BB': ('With a broadband Internet subscription', 'Estimate')}
+    with pytest.raises(KeyError, match='ambiguous'):
+        extract_metrics(sheet, metrics, layout=TableLayout.from_frame(sheet))
+    with pytest.raises(KeyError, match='ambiguous'):
+        stream_metrics(WORKBOOK, metrics)
+
+
+def test_missing_label_raises():
+    with pytest.raises(KeyError, match='No row labelled'):
+        stream_metrics(WORKBOOK, {'X': ('Carrier pigeon', 'Estimate')})
+
+
+def test_load_metrics_is_memoized_until_cleared(workbook_copy, sheet):
+    first = load_metrics(workbook_copy)
+    assert load_metrics(workbook_copy) is first
+    clear_cache()
+    again = load_metrics(workbook_copy)
+    assert again is not first
+    pd.testing.assert_frame_equal(again, build_metrics(sheet))
+    assert load_metrics(workbook_copy, stream=True) is not again
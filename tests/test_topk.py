@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pcid.selection import top_device_ownership, top_income_broadband
+from pcid.topk import grouped_top_k, top_k, top_k_many
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    n = 500
+    values = rng.integers(0, 40, n).astype(np.float64)  # Plenty of ties
+    values[rng.choice(n, 25, replace=False)] = np.nan
+    return pd.DataFrame({
+        'group': rng.choice(['b', 'a', 'c', 'd'], n),
+        'value': values,
+        'other': rng.normal(size=n),
+        'name': [f'row{i:03d}' for i in range(n)],
+    })
+
+
+@pytest.mark.parametrize('k', [0, 1, 5, 40, 1000])
+@pytest.mark.parametrize('ascending', [False, True])
+def test_top_k_matches_sort_values(frame, k, ascending):
+    expected = frame.sort_values('value', ascending=ascending, kind='stable').head(k)
+    pd.testing.assert_frame_equal(top_k(frame, 'value', k, ascending), expected)
+
+
+def test_tie_break_by_column(frame):
+    expected = frame.sort_values(['value', 'name'], ascending=[False, False], kind='stable').head(30)
+    result = top_k(frame, 'value', 30, tie_break='name', tie_ascending=False)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_top_k_many_matches_top_k(frame):
+    result = top_k_many(frame, ['value', 'other'], 12)
+    for column in ('value', 'other'):
+        pd.testing.assert_frame_equal(result[column], top_k(frame, column, 12))
+
+
+@pytest.mark.parametrize('k', [0, 3, 200])
+def test_grouped_top_k_matches_groupby(frame, k):
+    expected = pd.concat([group.sort_values('value', ascending=False, kind='stable').head(k)
+                          for _, group in frame.groupby('group', sort=False)])
+    pd.testing.assert_frame_equal(grouped_top_k(frame, 'group', 'value', k), expected)
+
+
+def test_selections_match_sort_values(df_metrics):
+    expected = df_metrics.sort_values('Income_75k+_BB_Pct', ascending=False).head(5)
+    assert top_income_broadband(df_metrics)['State'].tolist() == expected['State'].tolist()
+    expected = df_metrics.sort_values('Desktop_Laptop_Pct', ascending=False).head(5)
+    assert top_device_ownership(df_metrics)['State'].tolist() == expected['State'].tolist()
+
+
+def test_other_rankings_keep_ties_in_frame_order(df_metrics):
+    tied = df_metrics.assign(Smartphone_Pct=np.float32(90.0))
+    assert top_income_broadband(tied, by='Smartphone_Pct')['State'].tolist() == tied['State'].head(5).tolist()
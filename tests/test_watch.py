@@ -0,0 +1,44 @@
+import numpy as np
+
+from pcid.build import BUILT
+from pcid.pipeline import visuals_graph
+from pcid.watch import diff_metrics
+from tests.conftest import edit_workbook
+
+
+def test_diff_metrics(df_metrics):
+    assert diff_metrics(df_metrics, df_metrics.copy()) == []
+
+    edited = df_metrics.copy()
+    utah = edited.index[edited['State'] == 'Utah'][0]
+    edited.loc[utah, 'Smartphone_Pct'] = np.float32(12.5)
+    (change,) = diff_metrics(df_metrics, edited)
+    assert change[:2] == ('Utah', 'Smartphone_Pct') and change[3] == 12.5
+    assert change[2] == df_metrics.loc[utah, 'Smartphone_Pct']
+
+    # NaN on both sides is no change; NaN on one side is
+    old, new = df_metrics.copy(), df_metrics.copy()
+    old['Satellite_Pct'] = new['Satellite_Pct'] = np.float32(np.nan)
+    assert diff_metrics(old, new) == []
+    assert len(diff_metrics(df_metrics, new)) == len(df_metrics)
+
+
+def test_diff_metrics_of_a_different_shape_is_none(df_metrics):
+    assert diff_metrics(None, df_metrics) is None
+    assert diff_metrics(df_metrics, df_metrics.drop(columns=['Satellite'])) is None
+    assert diff_metrics(df_metrics, df_metrics.iloc[:-1]) is None
+    assert diff_metrics(df_metrics, df_metrics.iloc[::-1].reset_index(drop=True)) is None
+
+
+def test_edit_rebuilds_only_the_affected_visual(workbook_copy, tmp_path):
+    graph = visuals_graph(workbook_copy, out_dir=str(tmp_path))
+    assert all(result == BUILT for name, result in graph.build(workers=1).items() if name.startswith('visual'))
+    before = graph.values['metrics']
+
+    edit_workbook(workbook_copy, 'Utah', 'Satellite Internet service', {0: '1,000'})
+    status = graph.build(workers=1)
+
+    assert [name for name, result in status.items() if name.startswith('visual') and result == BUILT] == ['visual3']
+    changes = {(state, column): new for state, column, _, new in diff_metrics(before, graph.values['metrics'])}
+    assert set(changes) == {('Utah', 'Satellite'), ('Utah', 'Optic_Satellite_Gap')}
+    assert changes['Utah', 'Satellite'] == 1000